@@ -8,6 +8,7 @@ from fastapi import FastAPI, Request, HTTPException, Response
 from fastapi.responses import JSONResponse
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     CallbackQueryHandler,
     CommandHandler,
@@ -157,7 +158,13 @@ def _can_resolve_webhook_host(webhook_url: str) -> bool:
 @app.on_event("startup")
 async def on_startup() -> None:
     global APPLICATION
-    APPLICATION = Application.builder().token(TOKEN).build()
+    APPLICATION = (
+        Application.builder()
+        .token(TOKEN)
+        # Keeps fan-out under Telegram's flood limits and retries on RetryAfter.
+        .rate_limiter(AIORateLimiter(max_retries=3))
+        .build()
+    )
     bot_username = (await APPLICATION.bot.get_me()).username
     compose_game.BOT_USERNAME = bot_username
     grebeshok_game.BOT_USERNAME = bot_username
@@ -198,6 +205,7 @@ async def on_startup() -> None:
 async def on_shutdown() -> None:
     await APPLICATION.stop()
     await APPLICATION.shutdown()
+    balda_game.STATE_MANAGER.flush_now()
 
 
 @app.post(WEBHOOK_PATH)
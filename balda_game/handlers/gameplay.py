@@ -5,6 +5,7 @@ from __future__ import annotations
 import asyncio
 import html
 import json
+import re
 from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
@@ -128,11 +129,11 @@ async def update_board_image(
             )
         return
     game_id = state.game_id
-    buffer = RENDERER.render_board_image(state, helper_word=helper_word)
+    buffer = await RENDERER.render_board_image_async(state, helper_word=helper_word)
     payload = buffer.getvalue()
 
     def _build_file() -> InputFile:
-        return InputFile(BytesIO(payload), filename="balda_board.png")
+        return InputFile(BytesIO(payload), filename=RENDERER.filename)
 
     current_task = asyncio.current_task()
     active_task = BOARD_FLASH_TASKS.get(game_id)
@@ -193,8 +194,15 @@ class AwaitingBaldaMoveFilter(filters.MessageFilter):
 AWAITING_BALDA_MOVE_FILTER = AwaitingBaldaMoveFilter()
 
 
+# Alphanumerics outside а-я and the decimal digits. This is a superset of the
+# letters that fail the check: it also catches numerics such as "²" or "½",
+# which isalpha() then filters back out.
+_NON_CYRILLIC_ALNUM_RE = re.compile(r"[^\W\d_а-я]")
+
+
 def _is_cyrillic(text: str) -> bool:
-    return all("а" <= ch <= "я" for ch in text if ch.isalpha())
+    others = _NON_CYRILLIC_ALNUM_RE.findall(text)
+    return not others or not any(ch.isalpha() for ch in others)
 
 
 def _clear_pending_move(user_id: int) -> None:
@@ -328,7 +336,7 @@ async def _prompt_direction_choice(
             message_id=direct_message.message_id,
         )
 
-    name_html = html.escape(player.name)
+    name_html = player.escaped_name
     chat_lines = [
         f"Ход игрока <b>{name_html}</b>. Выберите сторону для новой буквы.",
     ]
@@ -458,7 +466,7 @@ async def pass_turn_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     except TelegramError:
         pass
     if context.bot:
-        name = html.escape(player.name)
+        name = player.escaped_name
         await context.bot.send_message(
             state.chat_id,
             f"🔁 {name} воспользовался пасом — ход переходит к следующему игроку.",
@@ -549,7 +557,7 @@ async def _announce_turn(
     letter_display = turn.letter.upper()
     direction_text = "слева" if turn.direction == "left" else "справа"
     text = (
-        f"💡 {html.escape(player.name if player else 'Игрок')} добавил {direction_text} букву"
+        f"💡 {player.escaped_name if player else 'Игрок'} добавил {direction_text} букву"
         f" <b>{letter_display}</b> (слово: <b>{word_display}</b>).\n"
         f"Текущая последовательность: {preview}"
     )
@@ -580,7 +588,7 @@ async def finish_game(
     _cancel_turn_jobs(state)
     _cancel_flash_task(state.game_id)
     stats = collect_game_stats(state)
-    winner_name = html.escape(winner.name)
+    winner_name = winner.escaped_name
     sequence_display = html.escape(stats.final_sequence)
     stats_message = format_stats_message(stats, winner_name=winner.name)
 
@@ -637,7 +645,7 @@ async def _handle_loss(
     _cancel_turn_jobs(state)
     player = state.players.get(player_id)
     if context.bot:
-        name = html.escape(player.name) if player else "Игрок"
+        name = player.escaped_name if player else "Игрок"
         await context.bot.send_message(
             state.chat_id,
             (
@@ -670,7 +678,7 @@ async def turn_warning_job(context: CallbackContext) -> None:
     chat_text = text
     parse_mode = None
     if player and player.name:
-        chat_text = f"15 seconds left — ход игрока <b>{html.escape(player.name)}</b>."
+        chat_text = f"15 seconds left — ход игрока <b>{player.escaped_name}</b>."
         parse_mode = "HTML"
     try:
         await context.bot.send_message(
@@ -700,7 +708,7 @@ async def turn_timeout_job(context: CallbackContext) -> None:
     _clear_pending_move(player_id)
     await _drop_direction_prompt(state.game_id, player_id, context)
     if context.bot:
-        name = html.escape(player.name) if player else "Игрок"
+        name = player.escaped_name if player else "Игрок"
         try:
             await context.bot.send_message(
                 state.chat_id,
@@ -58,6 +58,10 @@ INVISIBLE_MESSAGE = "\u2063"
 LETTER_EXCLUDED = {"ъ", "ё", "ы"}
 CYRILLIC_ALPHABET = tuple(chr(code) for code in range(ord("а"), ord("я") + 1)) + ("ё",)
 RANDOM_LETTERS = tuple(letter for letter in CYRILLIC_ALPHABET if letter not in LETTER_EXCLUDED)
+_LETTER_PROMPT_BUTTONS = (
+    ("Ввести букву", "balda:letter:manual:{}"),
+    ("Случайная буква", "balda:letter:random:{}"),
+)
 
 
 class AwaitingBaldaNameFilter(filters.MessageFilter):
@@ -201,7 +205,7 @@ async def _announce_player_join(
         for pid in state.players_active
         if (participant := state.players.get(pid)) and not participant.is_eliminated
     )
-    player_name = html.escape(player.name)
+    player_name = player.escaped_name
     lines = [
         f"👋 <b>{player_name}</b> присоединился к лобби.",
         f"Игроков сейчас: {active_count}/{MAX_PLAYERS}.",
@@ -314,6 +318,7 @@ async def newgame(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     state.players[user.id] = PlayerState(user_id=user.id, name=host_name, is_host=True)
     state.players_active = [user.id]
     state.has_started = False
+    STATE_MANAGER.save(state)
     await _publish_lobby(update, context, state, fresh_start=True)
     await _sync_invite_keyboard(state, context)
 
@@ -357,6 +362,7 @@ async def _join_lobby(update: Update, context: ContextTypes.DEFAULT_TYPE, join_c
         return
     state.players[user.id] = PlayerState(user_id=user.id, name=_get_display_name(context, user))
     state.players_active.append(user.id)
+    STATE_MANAGER.save(state)
     await message.reply_text(
         "Вы присоединились к лобби «Балда». Дождитесь команды старта от хоста.",
     )
@@ -444,7 +450,7 @@ async def _handle_lobby_departure(
         await _announce_departure(
             state,
             context,
-            f"🚪 {html.escape(player.name)} закрыл(а) лобби «Балда».",
+            f"🚪 {player.escaped_name} закрыл(а) лобби «Балда».",
         )
         STATE_MANAGER.drop_game(state.game_id)
         return
@@ -452,11 +458,11 @@ async def _handle_lobby_departure(
     STATE_MANAGER.save(state)
     host_note = ""
     if new_host:
-        host_note = f" Новый хост — <b>{html.escape(new_host.name)}</b>."
+        host_note = f" Новый хост — <b>{new_host.escaped_name}</b>."
     await _announce_departure(
         state,
         context,
-        f"🚪 {html.escape(player.name)} покинул(а) лобби «Балда».{host_note}",
+        f"🚪 {player.escaped_name} покинул(а) лобби «Балда».{host_note}",
     )
     await _publish_lobby(update, context, state)
     await _sync_invite_keyboard(state, context)
@@ -482,7 +488,7 @@ async def _handle_active_forfeit(
     await _announce_departure(
         state,
         context,
-        f"❌ {html.escape(player.name)} покинул(а) игру и считается проигравшим.",
+        f"❌ {player.escaped_name} покинул(а) игру и считается проигравшим.",
     )
     await eliminate_player(state, context, user_id)
     if (not state.base_letter) and STATE_MANAGER.get_by_id(state.game_id):
@@ -588,7 +594,7 @@ async def users_shared_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             continue
         try:
             await bot.send_message(user_id, f"Приглашение в игру: {link}")
-            state.invited_users.add(user_id)
+            state.invite(user_id)
             delivered.append(user_label)
         except (Forbidden, BadRequest) as exc:
             reason = str(exc)
@@ -741,12 +747,12 @@ def _format_score(state: GameState) -> str:
                 continue
             marker = "👑 " if player.is_host else ""
             status_icon = "✖️" if player.is_eliminated else "✅"
-            lines.append(f"{status_icon} {idx}. {marker}{html.escape(player.name)}")
+            lines.append(f"{status_icon} {idx}. {marker}{player.escaped_name}")
     if state.words_used:
         lines.append("\n<em>История слов:</em>")
         for idx, turn in enumerate(state.words_used, start=1):
             player = state.players.get(turn.player_id)
-            player_name = html.escape(player.name) if player else "Игрок"
+            player_name = player.escaped_name if player else "Игрок"
             direction_icon = "◀️" if turn.direction == "left" else "▶️"
             letter_display = turn.letter.upper()
             word_display = turn.word.upper()
@@ -758,7 +764,7 @@ def _format_score(state: GameState) -> str:
         lines.append('\nИстория ходов пока пуста — жмите "Старт", чтобы начать игру.')
     lines.append("\n<em>Выбывшие:</em>")
     eliminated = [
-        html.escape(state.players[player_id].name)
+        state.players[player_id].escaped_name
         for player_id in state.players_out
         if player_id in state.players and state.players[player_id].name
     ]
@@ -831,7 +837,7 @@ def _format_lobby(state: GameState, *, fresh_start: bool) -> str:
             continue
         marker = "👑 " if player.is_host else ""
         status = " (выбыл)" if player.is_eliminated else ""
-        lines.append(f"{idx}. {marker}{html.escape(player.name)}{status}")
+        lines.append(f"{idx}. {marker}{player.escaped_name}{status}")
     active_count = sum(
         1
         for pid in state.players_active
@@ -865,18 +871,17 @@ def _build_keyboard(state: GameState) -> Optional[InlineKeyboardMarkup]:
 async def _send_letter_choice_prompt(state: GameState, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not context.bot:
         return
-    keyboard = InlineKeyboardMarkup(
-        [
+    keyboard = state.letter_prompt_markup
+    if keyboard is None:
+        keyboard = InlineKeyboardMarkup(
             [
-                InlineKeyboardButton(
-                    "Ввести букву", callback_data=f"balda:letter:manual:{state.game_id}"
-                ),
-                InlineKeyboardButton(
-                    "Случайная буква", callback_data=f"balda:letter:random:{state.game_id}"
-                ),
+                [
+                    InlineKeyboardButton(text, callback_data=pattern.format(state.game_id))
+                    for text, pattern in _LETTER_PROMPT_BUTTONS
+                ]
             ]
-        ]
-    )
+        )
+        state.letter_prompt_markup = keyboard
     await context.bot.send_message(
         state.chat_id,
         "Выберите стартовую букву:",
@@ -888,8 +893,7 @@ async def _send_letter_choice_prompt(state: GameState, context: ContextTypes.DEF
 async def _finalize_initial_letter(
     state: GameState, letter: str, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    state.base_letter = letter
-    state.sequence = letter
+    state.set_initial_letter(letter)
     STATE_MANAGER.save(state)
     if context.bot:
         await context.bot.send_message(
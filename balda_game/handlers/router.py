@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import Awaitable, Callable, Dict, Optional
 
+from telegram import Update
 from telegram.ext import (
     Application,
     CallbackQueryHandler,
@@ -16,6 +17,7 @@ from telegram.ext import (
 from ..state.manager import STATE_MANAGER
 from .gameplay import (
     AWAITING_BALDA_MOVE_FILTER,
+    PENDING_MOVES,
     direction_choice_callback,
     handle_move_submission,
     pass_turn_callback,
@@ -23,6 +25,8 @@ from .gameplay import (
 from .lobby import (
     AWAITING_BALDA_LETTER_FILTER,
     AWAITING_BALDA_NAME_FILTER,
+    AWAITING_LETTER_USERS,
+    AWAITING_NAME_USERS,
     awaiting_name_guard,
     handle_letter_reply,
     handle_name_reply,
@@ -40,6 +44,40 @@ from .lobby import (
     users_shared_handler,
 )
 
+CallbackHandler = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]
+
+_CALLBACK_DISPATCH: Dict[str, CallbackHandler] = {
+    "start": start_button_callback,
+    "letter": letter_choice_callback,
+    "turn": direction_choice_callback,
+    "pass": pass_turn_callback,
+}
+
+
+async def root_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Route every ``balda:*`` callback query with a single prefix lookup."""
+
+    query = update.callback_query
+    if not query or not query.data:
+        return
+    handler = _CALLBACK_DISPATCH.get(query.data.split(":", 2)[1])
+    if handler:
+        await handler(update, context)
+
+
+async def awaiting_reply_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Dispatch a free-text reply to the step the user is currently in."""
+
+    user = update.effective_user
+    if not user:
+        return
+    if user.id in AWAITING_LETTER_USERS:
+        await handle_letter_reply(update, context)
+    elif user.id in AWAITING_NAME_USERS:
+        await handle_name_reply(update, context)
+    elif user.id in PENDING_MOVES:
+        await handle_move_submission(update, context)
+
 
 async def reset_for_chat(chat_id: int, user_id: int, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Drop temporary state for the provided chat."""
@@ -64,24 +102,10 @@ def register_handlers(application: Optional[Application]) -> None:
     application.add_handler(MessageHandler(filters.COMMAND, awaiting_name_guard), group=-1)
     application.add_handler(
         MessageHandler(
-            filters.TEXT & (~filters.COMMAND) & AWAITING_BALDA_LETTER_FILTER,
-            handle_letter_reply,
-            block=False,
-        ),
-        group=-1,
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.TEXT & (~filters.COMMAND) & AWAITING_BALDA_NAME_FILTER,
-            handle_name_reply,
-            block=False,
-        ),
-        group=-1,
-    )
-    application.add_handler(
-        MessageHandler(
-            filters.TEXT & (~filters.COMMAND) & AWAITING_BALDA_MOVE_FILTER,
-            handle_move_submission,
+            filters.TEXT
+            & (~filters.COMMAND)
+            & (AWAITING_BALDA_LETTER_FILTER | AWAITING_BALDA_NAME_FILTER | AWAITING_BALDA_MOVE_FILTER),
+            awaiting_reply_handler,
             block=False,
         ),
         group=-1,
@@ -100,7 +124,4 @@ def register_handlers(application: Optional[Application]) -> None:
         ),
         group=-1,
     )
-    application.add_handler(CallbackQueryHandler(start_button_callback, pattern="^balda:start:"))
-    application.add_handler(CallbackQueryHandler(letter_choice_callback, pattern="^balda:letter:"))
-    application.add_handler(CallbackQueryHandler(direction_choice_callback, pattern="^balda:turn:"))
-    application.add_handler(CallbackQueryHandler(pass_turn_callback, pattern="^balda:pass:"))
+    application.add_handler(CallbackQueryHandler(root_callback, pattern="^balda:"))
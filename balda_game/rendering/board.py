@@ -2,15 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
 import io
 import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Iterable, Sequence
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, features
 
 from ..state import GameState
 
+# Pillow builds without libwebp cannot encode WEBP; fall back to PNG there.
+_USE_WEBP = features.check("webp")
+
 
 @dataclass(slots=True)
 class BaldaRenderTheme:
@@ -26,6 +32,8 @@ class BaldaRenderer:
     """Render both textual fallbacks and Pillow images for Balda."""
 
     BOARD_SIZE = (1024, 576)
+    TITLE = "БАЛДА"
+    HELPER_LABEL = "Слово хода"
     REGULAR_FONTS = (
         "/usr/share/fonts/truetype/ptserif/PTSerif-Regular.ttf",
         "/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf",
@@ -39,13 +47,23 @@ class BaldaRenderer:
 
     def __init__(self, theme: BaldaRenderTheme | None = None) -> None:
         self.theme = theme or BaldaRenderTheme()
+        self.image_format = "WEBP" if _USE_WEBP else "PNG"
+        self.filename = f"balda_board.{self.image_format.lower()}"
         self._font_cache: dict[tuple[int, bool], ImageFont.ImageFont] = {}
+        self._font_height_cache: dict[tuple[object, object], int] = {}
+        self._label_cache: dict[str, tuple[float, int]] = {}
+        self._label_patch: tuple[tuple[int, int, int, int], Image.Image] | None = None
+        self._chrome: Image.Image | None = None
+        self._chrome_lock = threading.Lock()
+        self._local = threading.local()
+        self._executor: ThreadPoolExecutor | None = None
+        self._split_cache: dict[int, int] = {}
 
     def render_sequence(self, state: GameState) -> str:
         """Return a string representation of the current letter sequence."""
 
-        sequence = state.sequence or state.base_letter or "—"
-        return f"<b>{sequence.upper()}</b>"
+        sequence = state.sequence_upper or (state.sequence or state.base_letter or "—").upper()
+        return f"<b>{sequence}</b>"
 
     def render_recent_words(self, state: GameState, limit: int = 5) -> str:
         """Return a formatted history of recent turns."""
@@ -60,28 +78,82 @@ class BaldaRenderer:
     def render_board_image(
         self, state: GameState, *, helper_word: str | None = None
     ) -> io.BytesIO:
-        """Render the Balda board as a PNG stored in an in-memory buffer."""
+        """Render the Balda board as WEBP (or PNG) into an in-memory buffer."""
+
+        return self._render(*self._board_inputs(state, helper_word))
+
+    async def render_board_image_async(
+        self, state: GameState, *, helper_word: str | None = None
+    ) -> io.BytesIO:
+        """Render the board on a worker thread so the event loop stays free.
+
+        The inputs are read from ``state`` on the calling thread; only the
+        Pillow drawing and encoding run in the executor.
+        """
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="balda-render")
+        inputs = self._board_inputs(state, helper_word)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._render, *inputs)
 
-        sequence = (state.sequence or state.base_letter or "—").strip() or "—"
-        sequence = sequence.upper()
+    def _board_inputs(
+        self, state: GameState, helper_word: str | None
+    ) -> tuple[str, int | None, str | None]:
+        sequence = state.sequence_upper
+        if not sequence:
+            sequence = (state.sequence or state.base_letter or "—").strip() or "—"
+            sequence = sequence.upper()
         highlight_index = self._resolve_highlight_index(state, sequence)
         helper_text = helper_word.upper() if helper_word else None
+        return sequence, highlight_index, helper_text
+
+    def _render(
+        self, sequence: str, highlight_index: int | None, helper_text: str | None
+    ) -> io.BytesIO:
         lines = self._split_sequence(sequence)
-        image = Image.new("RGB", self.BOARD_SIZE, color=self.theme.background)
+        image = self._canvas()
         draw = ImageDraw.Draw(image)
-        self._draw_background(draw)
-        self._draw_grid(draw)
         self._draw_sequence(draw, lines, highlight_index)
         if helper_text:
+            self._paste_helper_label(image)
             self._draw_helper_word(draw, helper_text)
         buffer = io.BytesIO()
-        image.save(buffer, format="PNG")
+        if self.image_format == "WEBP":
+            image.save(buffer, format="WEBP", quality=85, method=2)
+        else:
+            image.save(buffer, format="PNG")
         buffer.seek(0)
         return buffer
 
+    def _canvas(self) -> Image.Image:
+        """Return this thread's reusable image reset to the static chrome."""
+
+        chrome = self._chrome
+        if chrome is None:
+            with self._chrome_lock:
+                if self._chrome is None:
+                    self._chrome = self._build_chrome()
+                chrome = self._chrome
+        image = getattr(self._local, "image", None)
+        if image is None:
+            image = self._local.image = Image.new("RGB", self.BOARD_SIZE)
+        image.paste(chrome, (0, 0))
+        return image
+
+    def _build_chrome(self) -> Image.Image:
+        image = Image.new("RGB", self.BOARD_SIZE, color=self.theme.background)
+        draw = ImageDraw.Draw(image)
+        self._draw_background(draw)
+        self._draw_grid(draw)
+        return image
+
     def _split_sequence(self, sequence: str) -> list[str]:
-        if len(sequence) >= 10:
-            midpoint = math.ceil(len(sequence) / 2)
+        length = len(sequence)
+        midpoint = self._split_cache.get(length)
+        if midpoint is None:
+            midpoint = self._split_cache[length] = math.ceil(length / 2) if length >= 10 else 0
+        if midpoint:
             return [sequence[:midpoint], sequence[midpoint:]]
         return [sequence]
 
@@ -90,9 +162,8 @@ class BaldaRenderer:
     ) -> int | None:
         if not sequence:
             return None
-        if state.words_used:
-            last_turn = state.words_used[-1]
-            return 0 if last_turn.direction == "left" else len(sequence) - 1
+        if state.last_direction == "left":
+            return 0
         return len(sequence) - 1
 
     def _draw_background(self, draw: ImageDraw.ImageDraw) -> None:
@@ -109,10 +180,9 @@ class BaldaRenderer:
         )
         header_height = 110
         draw.rectangle((margin, margin, width - margin, margin + header_height), fill="#563321")
-        title = "БАЛДА"
+        title = self.TITLE
         title_font = self._get_font(56, bold=True)
-        title_width = draw.textlength(title, font=title_font)
-        title_height = self._font_height(title_font)
+        title_width, title_height = self._label_metrics(draw, title, title_font)
         title_x = (width - title_width) / 2
         title_y = margin + (header_height - title_height) / 2
         draw.text((title_x, title_y), title, fill="#fff7e8", font=title_font)
@@ -172,21 +242,28 @@ class BaldaRenderer:
             start_y += font_height + line_gap
             global_index += len(line)
 
+    def _paste_helper_label(self, image: Image.Image) -> None:
+        """Stamp the fixed helper label from a glyph mask rasterized once."""
+
+        patch = self._label_patch
+        if patch is None:
+            width, height = self.BOARD_SIZE
+            label = self.HELPER_LABEL
+            label_font = self._get_font(34)
+            mask = Image.new("L", self.BOARD_SIZE, 0)
+            draw = ImageDraw.Draw(mask)
+            label_width, _ = self._label_metrics(draw, label, label_font)
+            draw.text(((width - label_width) / 2, height - 150), label, font=label_font, fill=255)
+            box = mask.getbbox() or (0, 0, 0, 0)
+            patch = self._label_patch = (box, mask.crop(box))
+        box, mask = patch
+        image.paste(self.theme.primary_text, box, mask)
+
     def _draw_helper_word(self, draw: ImageDraw.ImageDraw, helper_word: str) -> None:
         width, height = self.BOARD_SIZE
-        label = "Слово хода"
-        label_font = self._get_font(34)
         helper_font = self._get_font(64, bold=True)
-        label_width = draw.textlength(label, font=label_font)
         helper_width = draw.textlength(helper_word, font=helper_font)
-        label_y = height - 150
-        helper_y = label_y + 42
-        draw.text(
-            ((width - label_width) / 2, label_y),
-            label,
-            font=label_font,
-            fill=self.theme.primary_text,
-        )
+        helper_y = height - 150 + 42
         draw.text(
             ((width - helper_width) / 2, helper_y),
             helper_word,
@@ -194,6 +271,17 @@ class BaldaRenderer:
             fill=self.theme.accent_text,
         )
 
+    def _label_metrics(
+        self, draw: ImageDraw.ImageDraw, label: str, font: ImageFont.ImageFont
+    ) -> tuple[float, int]:
+        metrics = self._label_cache.get(label)
+        if metrics is None:
+            metrics = self._label_cache[label] = (
+                draw.textlength(label, font=font),
+                self._font_height(font),
+            )
+        return metrics
+
     def _font_size(self, line_length: int, total_lines: int) -> int:
         if total_lines == 1:
             if line_length <= 3:
@@ -227,8 +315,15 @@ class BaldaRenderer:
         return fallback
 
     def _font_height(self, font: ImageFont.ImageFont) -> int:
+        path = getattr(font, "path", None)
+        key = (path, getattr(font, "size", None)) if path else (id(font), None)
+        cached = self._font_height_cache.get(key)
+        if cached is not None:
+            return cached
         try:
             bbox = font.getbbox("Б")
-            return int(bbox[3] - bbox[1])
+            height = int(bbox[3] - bbox[1])
         except AttributeError:
-            return font.getsize("Б")[1]
+            height = font.getsize("Б")[1]
+        self._font_height_cache[key] = height
+        return height
@@ -3,11 +3,11 @@
 from __future__ import annotations
 
 import html
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Sequence
+from typing import List
 
-from ..state import GameState
+from ..state import GameState, PlayerState
 
 
 @dataclass(slots=True)
@@ -20,19 +20,15 @@ class GameStats:
     duration_text: str
     final_sequence: str
     elimination_names: List[str]
+    elimination_names_html: List[str] = field(default_factory=list)
 
 
 def _format_duration(seconds: int) -> str:
-    seconds = max(seconds, 0)
-    minutes, seconds = divmod(seconds, 60)
-    hours, minutes = divmod(minutes, 60)
-    parts: list[str] = []
+    hours, rem = divmod(max(seconds, 0), 3600)
+    minutes, seconds = divmod(rem, 60)
     if hours:
-        parts.append(f"{hours}ч")
-    if minutes or hours:
-        parts.append(f"{minutes:02d}м" if hours else f"{minutes}м")
-    parts.append(f"{seconds:02d}с" if minutes or hours else f"{seconds}с")
-    return "".join(parts)
+        return f"{hours}ч{minutes:02d}м{seconds:02d}с"
+    return f"{minutes}м{seconds:02d}с" if minutes else f"{seconds}с"
 
 
 def _resolve_sequence(state: GameState) -> str:
@@ -43,12 +39,12 @@ def _resolve_sequence(state: GameState) -> str:
     return "—"
 
 
-def _collect_elimination_names(state: GameState) -> List[str]:
-    ordered: List[str] = []
+def _collect_eliminated_players(state: GameState) -> List[PlayerState]:
+    ordered: List[PlayerState] = []
     for player_id in state.players_out:
         player = state.players.get(player_id)
         if player and player.name:
-            ordered.append(player.name)
+            ordered.append(player)
     return ordered
 
 
@@ -57,22 +53,25 @@ def collect_game_stats(state: GameState, *, now: datetime | None = None) -> Game
 
     moment = now or datetime.utcnow()
     duration_seconds = int(max((moment - state.created_at).total_seconds(), 0))
-    total_turns = len(state.words_used)
-    unique_words = len({turn.word for turn in state.words_used})
+    total_turns = state.total_turns
+    unique_words = len(state.unique_words)
     final_sequence = _resolve_sequence(state)
-    elimination_names = _collect_elimination_names(state)
+    eliminated = _collect_eliminated_players(state)
     return GameStats(
         total_turns=total_turns,
         unique_words=unique_words,
         duration_seconds=duration_seconds,
         duration_text=_format_duration(duration_seconds),
         final_sequence=final_sequence,
-        elimination_names=elimination_names,
+        elimination_names=[player.name for player in eliminated],
+        elimination_names_html=[player.escaped_name for player in eliminated],
     )
 
 
-def _format_elimination_summary(names: Sequence[str], winner_name: str | None) -> str:
-    parts = [html.escape(name) for name in names if name]
+def _format_elimination_summary(stats: GameStats, winner_name: str | None) -> str:
+    parts = list(stats.elimination_names_html) or [
+        html.escape(name) for name in stats.elimination_names if name
+    ]
     if winner_name:
         parts.append(f"Winner {html.escape(winner_name)}")
     if not parts:
@@ -89,7 +88,7 @@ def format_stats_message(stats: GameStats, *, winner_name: str | None = None) ->
         f"🕐 Duration: {stats.duration_text}",
         f"🔠 Unique words: {stats.unique_words}",
         f"💬 Final sequence: <b>{html.escape(stats.final_sequence)}</b>",
-        f"👥 Eliminations: {_format_elimination_summary(stats.elimination_names, winner_name)}",
+        f"👥 Eliminations: {_format_elimination_summary(stats, winner_name)}",
     ]
     return "\n".join(lines)
 
@@ -0,0 +1,90 @@
+"""Bounded in-memory containers used by the Balda state manager."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Iterator, MutableMapping, Optional, Tuple, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+DEFAULT_MAXSIZE = 10_000
+DEFAULT_TTL = 24 * 3600
+
+
+class TTLMap(MutableMapping[K, V], Generic[K, V]):
+    """Mapping whose entries expire ``ttl`` seconds after their last write.
+
+    Entries are kept in write order, so the oldest entry always sits at the
+    front and both expiry and size-based eviction pop from the left in O(1).
+    ``on_evict`` fires only for automatic evictions, never for explicit
+    ``pop``/``del`` calls.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        ttl: float = DEFAULT_TTL,
+        *,
+        timer: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[K, V], None]] = None,
+    ) -> None:
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._timer = timer
+        self._on_evict = on_evict
+
+    def __getitem__(self, key: K) -> V:
+        self.expire()
+        return self._data[key][1]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        now = self._timer()
+        self.expire(now)
+        self._data[key] = (now + self._ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            old_key, (_, old_value) = self._data.popitem(last=False)
+            self._evicted(old_key, old_value)
+
+    def __delitem__(self, key: K) -> None:
+        del self._data[key]
+
+    def __contains__(self, key: object) -> bool:
+        self.expire()
+        return key in self._data
+
+    def __iter__(self) -> Iterator[K]:
+        self.expire()
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        self.expire()
+        return len(self._data)
+
+    def expire(self, now: Optional[float] = None) -> None:
+        """Drop every entry whose deadline has passed."""
+
+        if not self._data:
+            return
+        if now is None:
+            now = self._timer()
+        data = self._data
+        while data:
+            key, (deadline, value) = next(iter(data.items()))
+            if deadline > now:
+                break
+            del data[key]
+            self._evicted(key, value)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def _evicted(self, key: K, value: V) -> None:
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+
+
+__all__ = ["TTLMap", "DEFAULT_MAXSIZE", "DEFAULT_TTL"]
@@ -2,36 +2,150 @@
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import base64
 import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
 from secrets import token_urlsafe
-from typing import Dict, Optional, Tuple
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
 
+from .cache import DEFAULT_MAXSIZE, DEFAULT_TTL, TTLMap
 from .models import GameState
-from .storage import DEFAULT_STATE_PATH, StateStorage
+from .storage import (
+    DEFAULT_STATE_PATH,
+    LEGACY_STATE_PATH,
+    GameKey,
+    RawGame,
+    StateStorage,
+    pack_chat_key,
+)
 
-GameKey = Tuple[int, int]
+
+GAME_ID_BYTES = 8
+JOIN_CODE_BYTES = 4
+TOKEN_POOL_SIZE = 64
+TOKEN_POOL_LOW_WATER = 16
+PERSIST_DELAY = 0.5
+SNAPSHOT_EVERY_OPS = 1000
+SNAPSHOT_INTERVAL = 60.0
+
+
+def _generate_tokens(nbytes: int, count: int) -> List[str]:
+    """Return ``count`` url-safe tokens drawn from a single ``os.urandom`` call."""
+
+    raw = os.urandom(nbytes * count)
+    return [
+        base64.urlsafe_b64encode(raw[offset : offset + nbytes]).rstrip(b"=").decode("ascii")
+        for offset in range(0, len(raw), nbytes)
+    ]
+
+
+def _nothing_to_write() -> None:
+    return None
+
+
+def _chat_key(chat_id: int, thread_id: Optional[int]) -> GameKey:
+    """Index key for a chat/thread; thread 0 stands for "no topic".
+
+    ``GameState.thread_id`` itself stays ``None`` for plain chats because it is
+    passed to Telegram as ``message_thread_id``, which does not accept 0.
+    """
+
+    return pack_chat_key(chat_id, thread_id or 0)
 
 
 class GameStateManager:
     """Utility that stores and retrieves Balda game sessions."""
 
-    def __init__(self, storage: Optional[StateStorage] = None) -> None:
+    __slots__ = (
+        "_logger",
+        "_storage",
+        "_active_games",
+        "_pending_games",
+        "_chat_index",
+        "_game_keys",
+        "_chat_to_keys",
+        "_join_codes",
+        "_game_to_code",
+        "_player_index",
+        "_game_players",
+        "_game_id_pool",
+        "_join_code_pool",
+        "_refill_scheduled",
+        "_dirty_games",
+        "_dropped_games",
+        "_snapshot_games",
+        "_snapshot_drops",
+        "_ops_since_snapshot",
+        "_last_snapshot",
+        "_flush_task",
+        "_write_queue",
+        "_writer_thread",
+        "_writer_lock",
+        "_loading",
+    )
+
+    def __init__(
+        self,
+        storage: Optional[StateStorage] = None,
+        *,
+        max_games: int = DEFAULT_MAXSIZE,
+        game_ttl: float = DEFAULT_TTL,
+    ) -> None:
         self._logger = logging.getLogger(__name__)
-        self._storage = storage or StateStorage(DEFAULT_STATE_PATH)
-        self._active_games: Dict[str, GameState] = {}
+        self._storage = storage or StateStorage(DEFAULT_STATE_PATH, legacy_path=LEGACY_STATE_PATH)
+        self._active_games: TTLMap[str, GameState] = TTLMap(
+            max_games, game_ttl, on_evict=self._on_game_evicted
+        )
+        # Games loaded from disk but not decoded yet; see ``_lookup``.
+        self._pending_games: TTLMap[str, RawGame] = TTLMap(
+            max_games, game_ttl, on_evict=self._on_pending_evicted
+        )
         self._chat_index: Dict[GameKey, str] = {}
+        self._game_keys: Dict[str, GameKey] = {}
+        self._chat_to_keys: Dict[int, Set[GameKey]] = {}
         self._join_codes: Dict[str, str] = {}
+        self._game_to_code: Dict[str, str] = {}
+        self._player_index: Dict[int, str] = {}
+        self._game_players: Dict[str, Set[int]] = {}
+        self._game_id_pool: Deque[str] = deque(_generate_tokens(GAME_ID_BYTES, TOKEN_POOL_SIZE))
+        self._join_code_pool: Deque[str] = deque(_generate_tokens(JOIN_CODE_BYTES, TOKEN_POOL_SIZE))
+        self._refill_scheduled = False
+        self._dirty_games: Set[str] = set()
+        self._dropped_games: Set[str] = set()
+        self._snapshot_games: Set[str] = set()
+        self._snapshot_drops: Set[str] = set()
+        self._ops_since_snapshot = 0
+        self._last_snapshot = time.monotonic()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_queue: "queue.SimpleQueue[Tuple[Callable[[], None], Future]]" = queue.SimpleQueue()
+        self._writer_thread: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        # Evictions while restoring are flushed once the indexes are complete.
+        self._loading = False
         self._load_from_disk()
 
     # Creation helpers -------------------------------------------------
     def create_lobby(self, host_id: int, chat_id: int, thread_id: Optional[int] = None) -> GameState:
         """Allocate a new lobby bound to the provided chat."""
 
-        game_id = token_urlsafe(8)
+        game_id = self._take_token(self._game_id_pool, GAME_ID_BYTES)
+        while game_id in self._active_games or game_id in self._pending_games:
+            game_id = token_urlsafe(GAME_ID_BYTES)
         state = GameState(game_id=game_id, host_id=host_id, chat_id=chat_id, thread_id=thread_id)
         self._active_games[game_id] = state
-        self._chat_index[(chat_id, thread_id or 0)] = game_id
-        self._persist()
+        key = _chat_key(chat_id, thread_id)
+        self._chat_index[key] = game_id
+        self._game_keys[game_id] = key
+        self._chat_to_keys.setdefault(chat_id, set()).add(key)
+        self._persist(game_id)
         return state
 
     def ensure_join_code(self, state: GameState) -> str:
@@ -39,30 +153,35 @@ class GameStateManager:
 
         if state.join_code and state.join_code in self._join_codes:
             return state.join_code
-        code = token_urlsafe(4)
+        code = self._take_token(self._join_code_pool, JOIN_CODE_BYTES)
+        while code in self._join_codes:
+            code = token_urlsafe(JOIN_CODE_BYTES)
+        stale = self._game_to_code.get(state.game_id)
+        if stale is not None:
+            self._join_codes.pop(stale, None)
         self._join_codes[code] = state.game_id
+        self._game_to_code[state.game_id] = code
         state.join_code = code
-        self._persist()
+        self._persist(state.game_id)
         return code
 
     # Lookup helpers ---------------------------------------------------
     def get_by_chat(self, chat_id: int, thread_id: Optional[int]) -> Optional[GameState]:
         """Return the lobby/game bound to the chat/thread combination."""
 
-        key = (chat_id, thread_id or 0)
-        game_id = self._chat_index.get(key)
-        return self._active_games.get(game_id) if game_id else None
+        game_id = self._chat_index.get(_chat_key(chat_id, thread_id))
+        return self._lookup(game_id) if game_id else None
 
     def get_by_id(self, game_id: str) -> Optional[GameState]:
         """Return a state snapshot by its internal identifier."""
 
-        return self._active_games.get(game_id)
+        return self._lookup(game_id)
 
     def get_by_join_code(self, join_code: str) -> Optional[GameState]:
         """Resolve and return a lobby via a join code."""
 
         game_id = self._join_codes.get(join_code)
-        return self._active_games.get(game_id) if game_id else None
+        return self._lookup(game_id) if game_id else None
 
     def has_join_code(self, join_code: str) -> bool:
         """Check if a join code belongs to the Balda manager."""
@@ -70,11 +189,12 @@ class GameStateManager:
         return join_code in self._join_codes
 
     def find_by_player(self, user_id: int) -> Optional[GameState]:
-        """Return the first game that still lists the provided player."""
+        """Return the most recently saved game that lists the provided player."""
 
-        for state in self._active_games.values():
-            if user_id in state.players:
-                return state
+        game_id = self._player_index.get(user_id)
+        state = self._lookup(game_id) if game_id else None
+        if state is not None and user_id in state.players:
+            return state
         return None
 
     # Mutation helpers -------------------------------------------------
@@ -82,68 +202,335 @@ class GameStateManager:
         """Persist changes to an existing game state."""
 
         self._active_games[state.game_id] = state
-        self._persist()
+        self._index_players(state)
+        self._persist(state.game_id)
         return state
 
     def reset_chat(self, chat_id: int) -> None:
         """Drop all bindings associated with the provided chat."""
 
-        keys = [key for key in self._chat_index if key[0] == chat_id]
-        for key in keys:
+        for key in self._chat_to_keys.pop(chat_id, ()):
             game_id = self._chat_index.pop(key, None)
             if not game_id:
                 continue
             state = self._active_games.pop(game_id, None)
             if state:
                 state.reset_timer()
-            stale_codes = [code for code, gid in self._join_codes.items() if gid == game_id]
-            for code in stale_codes:
-                self._join_codes.pop(code, None)
+            self._forget(game_id)
         self._persist()
 
     def drop_game(self, game_id: str) -> None:
         """Remove a single game and its join codes."""
 
         state = self._active_games.pop(game_id, None)
-        if not state:
+        if state is None and game_id not in self._pending_games:
             return
-        state.reset_timer()
-        key = (state.chat_id, state.thread_id or 0)
-        self._chat_index.pop(key, None)
-        stale_codes = [code for code, gid in self._join_codes.items() if gid == game_id]
-        for code in stale_codes:
-            self._join_codes.pop(code, None)
+        if state is not None:
+            state.reset_timer()
+        self._forget(game_id)
         self._persist()
 
     def reset(self) -> None:
         """Clear all stored data (used in tests)."""
 
+        self._cancel_flush()
+        self._wait_for_writer()
+        self._dirty_games.clear()
+        self._dropped_games.clear()
+        self._snapshot_games.clear()
+        self._snapshot_drops.clear()
+        self._ops_since_snapshot = 0
         self._active_games.clear()
+        self._pending_games.clear()
         self._chat_index.clear()
+        self._game_keys.clear()
+        self._chat_to_keys.clear()
         self._join_codes.clear()
+        self._game_to_code.clear()
+        self._player_index.clear()
+        self._game_players.clear()
         self._storage.clear()
 
-    # Internal helpers -------------------------------------------------
-    def _persist(self) -> None:
-        """Write the in-memory state to disk, logging any failures."""
+    # Persistence ------------------------------------------------------
+    async def flush(self) -> None:
+        """Write pending changes now, encoding on the loop and writing off it."""
+
+        if not self._dirty:
+            return
+        try:
+            await asyncio.wrap_future(self._submit(self._prepare_write()))
+        except Exception as exc:  # pragma: no cover - defensive logging
+            self._logger.exception("Failed to persist Balda state: %s", exc)
+
+    def flush_now(self, *, durable: bool = True) -> None:
+        """Synchronously write pending changes (shutdown and loop-less callers).
+
+        ``durable`` fsyncs the write; shutdown keeps the default, while
+        loop-less saves skip it like the debounced flushes do.
+        """
+
+        self._cancel_flush()
+        if not self._dirty:
+            return
+        try:
+            self._submit(self._prepare_write(durable=durable)).result()
+        except Exception as exc:  # pragma: no cover - defensive logging
+            self._logger.exception("Failed to persist Balda state: %s", exc)
+
+    def compact(self) -> None:
+        """Rewrite changed game files now and truncate the operation log."""
 
+        self._cancel_flush()
         try:
-            self._storage.dump(self._active_games, self._chat_index, self._join_codes)
+            self._submit(self._prepare_write(snapshot=True)).result()
         except Exception as exc:  # pragma: no cover - defensive logging
             self._logger.exception("Failed to persist Balda state: %s", exc)
 
+    # Internal helpers -------------------------------------------------
+    def _take_token(self, pool: Deque[str], nbytes: int) -> str:
+        """Pop a pre-generated token and top the pools up off the hot path."""
+
+        token = pool.popleft() if pool else token_urlsafe(nbytes)
+        if len(pool) < TOKEN_POOL_LOW_WATER and not self._refill_scheduled:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._refill_token_pools()
+            else:
+                self._refill_scheduled = True
+                loop.call_soon(self._refill_token_pools)
+        return token
+
+    def _refill_token_pools(self) -> None:
+        self._refill_scheduled = False
+        for pool, nbytes in (
+            (self._game_id_pool, GAME_ID_BYTES),
+            (self._join_code_pool, JOIN_CODE_BYTES),
+        ):
+            missing = TOKEN_POOL_SIZE - len(pool)
+            if missing > 0:
+                pool.extend(_generate_tokens(nbytes, missing))
+
+    @property
+    def _dirty(self) -> bool:
+        return bool(self._dirty_games or self._dropped_games)
+
+    def _persist(self, game_id: Optional[str] = None) -> None:
+        """Mark ``game_id`` dirty and coalesce writes into one delayed flush."""
+
+        if game_id is not None:
+            self._storage.invalidate(game_id)
+            self._dirty_games.add(game_id)
+        if not self._dirty:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_now(durable=False)
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        # Changes made while a write is in flight are picked up by another round.
+        while self._dirty:
+            await asyncio.sleep(PERSIST_DELAY)
+            await self.flush()
+
+    def _cancel_flush(self) -> None:
+        task, self._flush_task = self._flush_task, None
+        if task is None or task.done():
+            return
+        try:
+            task.cancel()
+        except RuntimeError:
+            # The loop that owned the task is already closed.
+            pass
+
+    def _submit(self, write: Callable[[], None]) -> Future:
+        """Queue ``write`` for the writer thread; writes run one at a time, in order."""
+
+        future: Future = Future()
+        with self._writer_lock:
+            if self._writer_thread is None or not self._writer_thread.is_alive():
+                self._writer_thread = threading.Thread(
+                    target=self._writer_loop, name="balda-state-writer", daemon=True
+                )
+                self._writer_thread.start()
+        self._write_queue.put((write, future))
+        return future
+
+    def _writer_loop(self) -> None:
+        while True:
+            write, future = self._write_queue.get()
+            try:
+                write()
+            except Exception as exc:  # pragma: no cover - defensive logging
+                future.set_exception(exc)
+            else:
+                future.set_result(None)
+
+    def _wait_for_writer(self) -> None:
+        """Block until every queued write has reached the storage."""
+
+        if self._writer_thread is not None and self._writer_thread.is_alive():
+            self._submit(lambda: None).result()
+
+    def _prepare_write(
+        self, *, snapshot: bool = False, durable: bool = False
+    ) -> Callable[[], None]:
+        """Encode pending changes and return the I/O step that stores them.
+
+        Encoding happens here, on the caller's thread, so the returned
+        callable never touches live game objects and may run elsewhere.
+        """
+
+        dirty, self._dirty_games = self._dirty_games, set()
+        dropped, self._dropped_games = self._dropped_games, set()
+        self._ops_since_snapshot += len(dirty) + len(dropped)
+        # Games touched since the last snapshot; only these files get rewritten.
+        self._snapshot_games.difference_update(dropped)
+        self._snapshot_games.update(dirty)
+        self._snapshot_drops.difference_update(dirty)
+        self._snapshot_drops.update(dropped)
+        if (
+            snapshot
+            or self._ops_since_snapshot >= SNAPSHOT_EVERY_OPS
+            or time.monotonic() - self._last_snapshot >= SNAPSHOT_INTERVAL
+        ):
+            self._ops_since_snapshot = 0
+            self._last_snapshot = time.monotonic()
+            changed, self._snapshot_games = self._snapshot_games, set()
+            removed, self._snapshot_drops = self._snapshot_drops, set()
+            blobs = {}
+            turns = {}
+            for game_id in changed:
+                state = self._active_games.get(game_id)
+                if state is not None:
+                    blobs[game_id] = self._storage.encode_game(state)
+                    turns[game_id] = self._storage.encode_turns(state)
+            index = self._storage.encode_index(
+                self._chat_index, self._join_codes, self._player_index
+            )
+            return partial(self._storage.write_snapshot, blobs, removed, index, turns)
+        records = [self._storage.encode_drop(game_id) for game_id in dropped]
+        turns = {}
+        for game_id in dirty:
+            state = self._active_games.get(game_id)
+            if state is None:
+                continue
+            turns[game_id] = self._storage.encode_turns(state)
+            key = self._game_keys.get(game_id)
+            if key is not None and self._chat_index.get(key) != game_id:
+                key = None
+            code = self._game_to_code.get(game_id)
+            records.append(self._storage.encode_put(state, key, code))
+        payload = b"".join(records)
+        if not payload and not any(turns.values()):
+            # Every save since the last write left its game unchanged.
+            return _nothing_to_write
+        return partial(self._storage.append, payload, turns, durable=durable)
+
+    def _index_players(self, state: GameState) -> None:
+        """Point the player index at ``state`` for everyone it currently lists."""
+
+        game_id = state.game_id
+        current = set(state.players)
+        for user_id in self._game_players.get(game_id, set()) - current:
+            if self._player_index.get(user_id) == game_id:
+                del self._player_index[user_id]
+        for user_id in current:
+            self._player_index[user_id] = game_id
+        self._game_players[game_id] = current
+
+    def _forget(self, game_id: str) -> None:
+        """Drop the index entries of a removed game and log its removal."""
+
+        self._storage.forget(game_id)
+        self._pending_games.pop(game_id, None)
+        for user_id in self._game_players.pop(game_id, ()):
+            if self._player_index.get(user_id) == game_id:
+                del self._player_index[user_id]
+        key = self._game_keys.pop(game_id, None)
+        if key is not None and self._chat_index.get(key) == game_id:
+            del self._chat_index[key]
+            chat_keys = self._chat_to_keys.get(key >> 32)
+            if chat_keys is not None:
+                chat_keys.discard(key)
+                if not chat_keys:
+                    del self._chat_to_keys[key >> 32]
+        code = self._game_to_code.pop(game_id, None)
+        if code is not None:
+            self._join_codes.pop(code, None)
+        self._dirty_games.discard(game_id)
+        self._dropped_games.add(game_id)
+
+    def _lookup(self, game_id: str) -> Optional[GameState]:
+        """Return a live game, decoding it first if it is still pending."""
+
+        state = self._active_games.get(game_id)
+        if state is not None:
+            return state
+        raw = self._pending_games.pop(game_id, None)
+        if raw is None:
+            return None
+        try:
+            state = self._storage.decode(raw)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            self._logger.exception("Failed to decode Balda game %s: %s", game_id, exc)
+            self._forget(game_id)
+            self._persist()
+            return None
+        # The restored player index already points each player at the game
+        # saved last; decoding an older game must not take them over.
+        self._active_games[game_id] = state
+        return state
+
+    def _on_pending_evicted(self, game_id: str, raw: RawGame) -> None:
+        self._logger.info("Evicting stale Balda game %s", game_id)
+        self._forget(game_id)
+        if not self._loading:
+            self._persist()
+
+    def _on_game_evicted(self, game_id: str, state: GameState) -> None:
+        """Keep the chat and join-code indexes in step with expired games."""
+
+        self._logger.info("Evicting stale Balda game %s", game_id)
+        state.reset_timer()
+        self._forget(game_id)
+        self._persist()
+
     def _load_from_disk(self) -> None:
-        """Restore previously saved games when the manager initializes."""
+        """Restore the indexes; games themselves are decoded on first access."""
 
         try:
-            games, chat_index, join_codes = self._storage.load()
+            games, chat_index, join_codes, players = self._storage.load()
         except Exception as exc:  # pragma: no cover - defensive logging
             self._logger.exception("Failed to load Balda state: %s", exc)
             return
-        self._active_games = games
+        self._active_games.clear()
+        self._pending_games.clear()
+        self._player_index = players
+        self._game_players = {}
+        for user_id, game_id in players.items():
+            self._game_players.setdefault(game_id, set()).add(user_id)
         self._chat_index = chat_index
+        self._game_keys = {game_id: key for key, game_id in chat_index.items()}
+        self._chat_to_keys = {}
+        for key in chat_index:
+            self._chat_to_keys.setdefault(key >> 32, set()).add(key)
         self._join_codes = join_codes
+        self._game_to_code = {game_id: code for code, game_id in join_codes.items()}
+        # Filled last so that games evicted for size are dropped from the
+        # indexes restored above.
+        self._loading = True
+        try:
+            self._pending_games.update(games)
+        finally:
+            self._loading = False
+        self._persist()
 
 
 STATE_MANAGER = GameStateManager()
+atexit.register(STATE_MANAGER.compact)
 
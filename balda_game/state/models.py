@@ -2,9 +2,28 @@
 
 from __future__ import annotations
 
+import html
+import sys
+from array import array
+from bisect import insort
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+DIRECTION_CODES = {"left": "L", "right": "R"}
+DIRECTION_NAMES = {code: name for name, code in DIRECTION_CODES.items()}
+
+
+def to_unix(moment: datetime) -> float:
+    """Convert a naive UTC timestamp into seconds since the epoch."""
+
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+def from_unix(seconds: float) -> datetime:
+    """Inverse of :func:`to_unix`, returning a naive UTC ``datetime``."""
+
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
 
 
 @dataclass(slots=True)
@@ -16,6 +35,12 @@ class PlayerState:
     has_passed: bool = False
     is_eliminated: bool = False
     is_host: bool = False
+    escaped_name: str = field(
+        default="", init=False, repr=False, compare=False, metadata={"persist": False}
+    )
+
+    def __post_init__(self) -> None:
+        self.escaped_name = html.escape(self.name)
 
 
 @dataclass(slots=True)
@@ -28,6 +53,12 @@ class TurnRecord:
     direction: str
     timestamp: datetime = field(default_factory=datetime.utcnow)
 
+    def __post_init__(self) -> None:
+        # Directions arrive from callback payloads and letters from messages;
+        # interning makes every turn share the same few string objects.
+        self.letter = sys.intern(self.letter)
+        self.direction = sys.intern(self.direction)
+
 
 @dataclass(slots=True)
 class GameState:
@@ -47,7 +78,7 @@ class GameState:
     players_out: List[int] = field(default_factory=list)
     words_used: List[TurnRecord] = field(default_factory=list)
     has_passed: Dict[int, bool] = field(default_factory=dict)
-    timer_job: Dict[str, object] = field(default_factory=dict)
+    timer_job: Dict[str, object] = field(default_factory=dict, metadata={"persist": False})
     has_started: bool = False
     join_code: Optional[str] = None
     lobby_message_id: Optional[int] = None
@@ -55,6 +86,54 @@ class GameState:
     board_message_id: Optional[int] = None
     invite_keyboard_visible: bool = False
     invited_users: set[int] = field(default_factory=set)
+    # Derived and runtime-only fields below are rebuilt on load, never persisted.
+    letter_prompt_markup: Optional[object] = field(
+        default=None, init=False, repr=False, compare=False, metadata={"persist": False}
+    )
+    unique_words: Set[str] = field(
+        default_factory=set, init=False, repr=False, metadata={"persist": False}
+    )
+    total_turns: int = field(default=0, init=False, repr=False, metadata={"persist": False})
+    sequence_upper: str = field(
+        default="", init=False, repr=False, compare=False, metadata={"persist": False}
+    )
+    last_direction: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False, metadata={"persist": False}
+    )
+    # Column-wise copy of ``words_used`` that storage serializes without
+    # building a dict per turn; kept in step by ``add_turn``.
+    turn_players: array = field(
+        default_factory=lambda: array("q"), init=False, repr=False, compare=False,
+        metadata={"persist": False},
+    )
+    turn_letters: List[str] = field(
+        default_factory=list, init=False, repr=False, compare=False, metadata={"persist": False}
+    )
+    turn_words: List[str] = field(
+        default_factory=list, init=False, repr=False, compare=False, metadata={"persist": False}
+    )
+    turn_directions: bytearray = field(
+        default_factory=bytearray, init=False, repr=False, compare=False,
+        metadata={"persist": False},
+    )
+    turn_times: array = field(
+        default_factory=lambda: array("d"), init=False, repr=False, compare=False,
+        metadata={"persist": False},
+    )
+    # ``invited_users`` kept in order for storage; maintained by ``invite``.
+    invited_sorted: List[int] = field(
+        default_factory=list, init=False, repr=False, compare=False, metadata={"persist": False}
+    )
+
+    def __post_init__(self) -> None:
+        self.sequence_upper = self.sequence.upper()
+        self.invited_sorted = sorted(self.invited_users)
+        if self.words_used:
+            self.unique_words = {turn.word for turn in self.words_used}
+            self.total_turns = len(self.words_used)
+            self.last_direction = self.words_used[-1].direction
+            for turn in self.words_used:
+                self._append_turn_columns(turn)
 
     def reset_timer(self) -> None:
         """Cancel and forget scheduled timer jobs for the current player."""
@@ -70,12 +149,39 @@ class GameState:
                     pass
         self.timer_job.clear()
 
+    def invite(self, user_id: int) -> None:
+        """Remember that ``user_id`` received a personal invitation."""
+
+        if user_id not in self.invited_users:
+            self.invited_users.add(user_id)
+            insort(self.invited_sorted, user_id)
+
+    def set_initial_letter(self, letter: str) -> None:
+        """Start the sequence from ``letter`` and reset the render caches."""
+
+        self.base_letter = letter
+        self.sequence = letter
+        self.sequence_upper = letter.upper()
+        self.last_direction = None
+
     def add_turn(self, turn: TurnRecord) -> None:
         """Append a new turn to the history and update the sequence."""
 
         self.words_used.append(turn)
+        self._append_turn_columns(turn)
+        self.unique_words.add(turn.word)
+        self.total_turns += 1
         if turn.direction == "left":
             self.sequence = f"{turn.letter}{self.sequence}"
         else:
             self.sequence = f"{self.sequence}{turn.letter}"
+        self.sequence_upper = self.sequence.upper()
         self.direction = turn.direction
+        self.last_direction = turn.direction
+
+    def _append_turn_columns(self, turn: TurnRecord) -> None:
+        self.turn_players.append(turn.player_id)
+        self.turn_letters.append(turn.letter)
+        self.turn_words.append(turn.word)
+        self.turn_directions += DIRECTION_CODES.get(turn.direction, "R").encode("ascii")
+        self.turn_times.append(to_unix(turn.timestamp))
@@ -1,65 +1,180 @@
-"""Utilities for serializing Balda game state to a local JSON file."""
+"""Utilities for persisting Balda game state as per-game JSON files."""
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
+import mmap
+import os
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from .models import GameState, PlayerState, TurnRecord
+from .models import DIRECTION_NAMES, GameState, PlayerState, TurnRecord, from_unix
+
+try:  # orjson is an optional speedup; the stdlib encoder is a drop-in fallback.
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
 
 LOGGER = logging.getLogger(__name__)
-DEFAULT_STATE_PATH = Path(__file__).resolve().parent / ".balda_state.json"
-
-GameKey = Tuple[int, int]
-
-
-def _serialize_player(player: PlayerState) -> Dict[str, object]:
-    return {
-        "user_id": player.user_id,
-        "name": player.name,
-        "has_passed": player.has_passed,
-        "is_eliminated": player.is_eliminated,
-        "is_host": player.is_host,
-    }
-
-
-def _serialize_turn(turn: TurnRecord) -> Dict[str, object]:
-    return {
-        "player_id": turn.player_id,
-        "letter": turn.letter,
-        "word": turn.word,
-        "direction": turn.direction,
-        "timestamp": turn.timestamp.isoformat(),
-    }
-
-
-def _serialize_state(state: GameState) -> Dict[str, object]:
-    return {
-        "game_id": state.game_id,
-        "host_id": state.host_id,
-        "chat_id": state.chat_id,
-        "sequence": state.sequence,
-        "base_letter": state.base_letter,
-        "current_player": state.current_player,
-        "direction": state.direction,
-        "created_at": state.created_at.isoformat(),
-        "thread_id": state.thread_id,
-        "players": {str(uid): _serialize_player(player) for uid, player in state.players.items()},
-        "players_active": state.players_active,
-        "players_out": state.players_out,
-        "words_used": [_serialize_turn(turn) for turn in state.words_used],
-        "has_passed": {str(uid): flag for uid, flag in state.has_passed.items()},
-        "has_started": state.has_started,
-        "join_code": state.join_code,
-        "lobby_message_id": state.lobby_message_id,
-        "lobby_message_chat_id": state.lobby_message_chat_id,
-        "board_message_id": state.board_message_id,
-        "invite_keyboard_visible": state.invite_keyboard_visible,
-        "invited_users": sorted(state.invited_users),
-    }
+DEFAULT_STATE_PATH = Path(__file__).resolve().parent / ".balda_state"
+LEGACY_STATE_PATH = Path(__file__).resolve().parent / ".balda_state.json"
+
+# Chat bindings are keyed by one int: the chat id shifted left by 32 bits
+# with the (non-negative, 32-bit) thread id in the low bits.
+GameKey = int
+_THREAD_MASK = 0xFFFFFFFF
+PARALLEL_READ_THRESHOLD = 64
+PARALLEL_READ_WORKERS = 8
+TurnSource = Callable[[str], List[TurnRecord]]
+# A persisted game that has not been turned into a GameState yet: the raw
+# bytes of its file, or the already parsed payload of a replayed log record.
+RawGame = Union[bytes, Dict[str, object]]
+
+
+def pack_chat_key(chat_id: int, thread_id: int) -> GameKey:
+    """Combine a chat id (possibly negative) and a thread id into one int key."""
+
+    return (chat_id << 32) | (thread_id & _THREAD_MASK)
+
+
+def unpack_chat_key(key: GameKey) -> Tuple[int, int]:
+    """Inverse of :func:`pack_chat_key`."""
+
+    return key >> 32, key & _THREAD_MASK
+
+
+def _persisted_fields(cls: type) -> Tuple[str, ...]:
+    """Names of the dataclass fields not marked ``metadata={"persist": False}``."""
+
+    return tuple(item.name for item in fields(cls) if item.metadata.get("persist", True))
+
+
+def _compile_serializer(
+    name: str, cls: type, overrides: Dict[str, str], namespace: Dict[str, object]
+) -> Callable[[object], Dict[str, object]]:
+    """Generate ``name(obj)`` returning a dict literal of ``cls``'s persisted fields.
+
+    The body spells out every attribute access, so a call costs one dict
+    display instead of a ``getattr`` loop. ``overrides`` maps a key to the
+    expression that produces it (``None`` drops the field).
+    """
+
+    entries = {field_name: f"obj.{field_name}" for field_name in _persisted_fields(cls)}
+    entries.update(overrides)
+    body = ", ".join(f"{key!r}: {expr}" for key, expr in entries.items() if expr is not None)
+    scope = dict(namespace)
+    exec(f"def {name}(obj):\n    return {{{body}}}\n", scope)
+    return scope[name]  # type: ignore[return-value]
+
+
+_serialize_player = _compile_serializer("_serialize_player", PlayerState, {}, {})
+_serialize_state = _compile_serializer(
+    "_serialize_state",
+    GameState,
+    {
+        "players": "{uid: _serialize_player(p) for uid, p in obj.players.items()}",
+        # The turns themselves live in the game's append-only turns file.
+        "words_used": None,
+        "turn_count": "len(obj.words_used)",
+        # The sorted copy is only trusted while it matches the set, in case
+        # someone added to invited_users directly instead of calling invite().
+        "invited_users": (
+            "obj.invited_sorted if len(obj.invited_sorted) == len(obj.invited_users)"
+            " else sorted(obj.invited_users)"
+        ),
+    },
+    {"_serialize_player": _serialize_player},
+)
+
+
+def _default(value: object) -> object:
+    """Encode the values neither encoder handles the way the state files expect."""
+
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, array):
+        return value.tolist()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _dumps(payload: object) -> bytes:
+    """Encode ``payload`` as compact UTF-8 JSON (integer keys become strings).
+
+    orjson encodes naive datetimes natively (same ISO format as ``isoformat``);
+    the stdlib fallback goes through :func:`_default` for them.
+    """
+
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        payload, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _loads(data: bytes | memoryview) -> object:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+def _mapped_lines(path: Path) -> Iterator[memoryview]:
+    """Yield the lines of ``path`` as views into a read-only memory map.
+
+    Each view is released as soon as the consumer moves on, so callers must
+    parse a line before asking for the next one and must not keep it.
+    """
+
+    with path.open("rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                start, end = 0, len(mapped)
+                while start < end:
+                    stop = mapped.find(b"\n", start)
+                    if stop == -1:
+                        stop = end
+                    line = view[start:stop]
+                    try:
+                        yield line
+                    finally:
+                        line.release()
+                    start = stop + 1
+            finally:
+                view.release()
+
+
+def _encode_turns(state: GameState, start: int) -> bytes:
+    """Encode turns ``start:`` as one compact JSON array per line."""
+
+    rows = zip(
+        state.turn_players[start:],
+        state.turn_letters[start:],
+        state.turn_words[start:],
+        state.turn_directions[start:].decode("ascii"),
+        state.turn_times[start:],
+    )
+    return b"".join(_dumps(list(row)) + b"\n" for row in rows)
+
+
+def _parse_turn_line(line: bytes) -> TurnRecord:
+    player_id, letter, word, code, seconds = _loads(line)
+    return TurnRecord(
+        player_id=int(player_id),
+        letter=str(letter),
+        word=str(word),
+        direction=DIRECTION_NAMES.get(code, "right"),
+        timestamp=from_unix(float(seconds)),
+    )
 
 
 def _parse_datetime(value: str | None) -> datetime:
@@ -93,10 +208,19 @@ def _deserialize_turn(payload: Dict[str, object]) -> TurnRecord:
     )
 
 
-def _deserialize_state(payload: Dict[str, object]) -> GameState:
+def _deserialize_turns(
+    payload: Dict[str, object], turns: Optional[TurnSource] = None
+) -> List[TurnRecord]:
+    count = payload.get("turn_count")
+    if count is not None and turns is not None:
+        return turns(str(payload["game_id"]))[: int(count)]
+    return [_deserialize_turn(entry) for entry in payload.get("words_used", [])]
+
+
+def _deserialize_state(payload: Dict[str, object], turns: Optional[TurnSource] = None) -> GameState:
     players_payload = payload.get("players", {})
     players = {int(uid): _deserialize_player(data) for uid, data in players_payload.items()}
-    words = [_deserialize_turn(entry) for entry in payload.get("words_used", [])]
+    words = _deserialize_turns(payload, turns)
     has_passed_payload = payload.get("has_passed", {})
     has_passed = {int(uid): bool(flag) for uid, flag in has_passed_payload.items()}
     invited_users_payload = payload.get("invited_users", [])
@@ -127,43 +251,436 @@ def _deserialize_state(payload: Dict[str, object]) -> GameState:
     )
 
 
-class StateStorage:
-    """Read and write Balda state snapshots to a JSON file."""
+def _apply_op(
+    op: str,
+    payload: Dict[str, object],
+    games: Dict[str, RawGame],
+    chat_index: Dict[GameKey, str],
+    join_codes: Dict[str, str],
+    players: Optional[Dict[int, str]],
+) -> Tuple[str, bool]:
+    """Apply one log record; return the affected game id and whether it survives."""
 
-    def __init__(self, path: Path) -> None:
-        self._path = path
+    if op == "put":
+        game = payload["game"]
+        game_id = str(game["game_id"])
+        games[game_id] = game
+        chat_key = payload.get("chat_key")
+        if chat_key:
+            chat_index[pack_chat_key(int(chat_key[0]), int(chat_key[1]))] = game_id
+        join_code = payload.get("join_code")
+        if join_code:
+            join_codes[str(join_code)] = game_id
+        if players is not None:
+            for uid in game.get("players", {}):
+                players[int(uid)] = game_id
+        return game_id, True
+    if op == "drop":
+        game_id = str(payload["game_id"])
+        games.pop(game_id, None)
+        for key in [key for key, gid in chat_index.items() if gid == game_id]:
+            del chat_index[key]
+        for code in [code for code, gid in join_codes.items() if gid == game_id]:
+            del join_codes[code]
+        if players is not None:
+            for uid in [uid for uid, gid in players.items() if gid == game_id]:
+                del players[uid]
+        return game_id, False
+    raise ValueError(f"unknown operation {op!r}")
 
-    def load(self) -> Tuple[Dict[str, GameState], Dict[GameKey, str], Dict[str, str]]:
-        """Load the serialized state from disk."""
 
-        if not self._path.exists():
-            return {}, {}, {}
+def _parse_index(
+    payload: Dict[str, object],
+) -> Tuple[Dict[GameKey, str], Dict[str, str], Optional[Dict[int, str]]]:
+    chat_index_payload: Iterable[Dict[str, object]] = payload.get("chat_index", [])
+    chat_index: Dict[GameKey, str] = {}
+    for entry in chat_index_payload:
         try:
-            payload = json.loads(self._path.read_text(encoding="utf-8"))
-        except (OSError, json.JSONDecodeError) as exc:
-            LOGGER.error("Failed to read Balda state from %s: %s", self._path, exc)
-            return {}, {}, {}
-        games_payload = payload.get("games", {})
-        games: Dict[str, GameState] = {}
-        for game_id, data in games_payload.items():
+            chat_id = int(entry["chat_id"])
+            thread_id = int(entry.get("thread_id", 0))
+            game_id = str(entry["game_id"])
+        except (KeyError, TypeError, ValueError) as exc:  # pragma: no cover - defensive logging
+            LOGGER.error("Invalid chat index entry %s: %s", entry, exc)
+            continue
+        chat_index[pack_chat_key(chat_id, thread_id)] = game_id
+    join_codes_payload = payload.get("join_codes", {})
+    join_codes: Dict[str, str] = {str(code): str(game_id) for code, game_id in join_codes_payload.items()}
+    players_payload = payload.get("players")
+    players = (
+        None
+        if players_payload is None
+        else {int(uid): str(game_id) for uid, game_id in players_payload.items()}
+    )
+    return chat_index, join_codes, players
+
+
+def _read_game_file(path: Path) -> Optional[bytes]:
+    try:
+        return path.read_bytes()
+    except OSError as exc:  # pragma: no cover - defensive logging
+        LOGGER.error("Failed to read Balda game from %s: %s", path, exc)
+        return None
+
+
+def _atomic_write(path: Path, data: bytes, durable: bool = False) -> None:
+    tmp_path = path.with_suffix(f"{path.suffix}.tmp")
+    with tmp_path.open("wb") as handle:
+        handle.write(data)
+        if durable:
+            handle.flush()
+            os.fsync(handle.fileno())
+    tmp_path.replace(path)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Persist renames and unlinks inside ``path`` (no-op where unsupported)."""
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class StateStorage:
+    """Persist Balda state as one file per game plus a small index and an op log.
+
+    Layout under ``path``: ``games/<game_id>.json`` with every game's fields,
+    ``games/<game_id>.turns.jsonl`` with its turn history, ``index.json`` for
+    the chat bindings and join codes, and ``ops.log`` with ``put``/``drop``
+    records appended since the last snapshot. A snapshot only rewrites the
+    games that changed, then truncates the log; ``load`` replays any leftover
+    records on top of the files. Turn files are only ever appended to: each
+    write adds the turns made since the previous one, and game records carry
+    a ``turn_count`` that says how many of those lines belong to the game.
+    """
+
+    __slots__ = (
+        "_root",
+        "_games_dir",
+        "_index_path",
+        "_log_path",
+        "_legacy_path",
+        "_encoded_cache",
+        "_turns_written",
+        "_put_digests",
+    )
+
+    def __init__(self, path: Path, *, legacy_path: Optional[Path] = None) -> None:
+        self._root = path
+        self._games_dir = path / "games"
+        self._index_path = path / "index.json"
+        self._log_path = path / "ops.log"
+        self._legacy_path = legacy_path
+        self._encoded_cache: Dict[str, bytes] = {}
+        self._turns_written: Dict[str, int] = {}
+        self._put_digests: Dict[str, bytes] = {}
+
+    def load(
+        self,
+    ) -> Tuple[Dict[str, RawGame], Dict[GameKey, str], Dict[str, str], Dict[int, str]]:
+        """Load the index and the raw games, then replay the operation log.
+
+        Games are returned undecoded; :meth:`decode` turns one into a
+        :class:`GameState` when it is first needed. The last mapping points
+        each player at the game that most recently listed them.
+        """
+
+        self._migrate_legacy()
+        games = self._load_games()
+        chat_index, join_codes, players = self._load_index()
+        replayed: set[str] = set()
+        dropped: set[str] = set()
+        for op, payload in self._read_log():
             try:
-                games[game_id] = _deserialize_state(data)
+                game_id, alive = _apply_op(op, payload, games, chat_index, join_codes, players)
             except Exception as exc:  # pragma: no cover - defensive logging
-                LOGGER.error("Failed to deserialize Balda game %s: %s", game_id, exc)
-        chat_index_payload: Iterable[Dict[str, object]] = payload.get("chat_index", [])
-        chat_index: Dict[GameKey, str] = {}
-        for entry in chat_index_payload:
-            try:
-                chat_id = int(entry["chat_id"])
-                thread_id = int(entry.get("thread_id", 0))
-                game_id = str(entry["game_id"])
-            except (KeyError, TypeError, ValueError) as exc:  # pragma: no cover - defensive logging
-                LOGGER.error("Invalid chat index entry %s: %s", entry, exc)
+                LOGGER.error("Failed to replay Balda state operation %s: %s", op, exc)
                 continue
-            chat_index[(chat_id, thread_id)] = game_id
-        join_codes_payload = payload.get("join_codes", {})
-        join_codes: Dict[str, str] = {str(code): str(game_id) for code, game_id in join_codes_payload.items()}
-        return games, chat_index, join_codes
+            (replayed if alive else dropped).add(game_id)
+            (dropped if alive else replayed).discard(game_id)
+        if players is None:
+            # Index written before it carried players: read them from the games,
+            # oldest first, so a player shared by several games maps to the
+            # newest one whatever order the files were listed in.
+            players = {}
+            parsed = []
+            for game_id, raw in games.items():
+                try:
+                    game = _loads(raw) if isinstance(raw, bytes) else raw
+                except ValueError as exc:  # pragma: no cover - defensive logging
+                    LOGGER.error("Failed to read Balda game %s: %s", game_id, exc)
+                    continue
+                parsed.append((str(game.get("created_at") or ""), game_id, game))
+            parsed.sort(key=lambda item: item[:2])
+            for _, game_id, game in parsed:
+                for uid in game.get("players", {}):
+                    players[int(uid)] = game_id
+        if replayed or dropped:
+            # Fold the recovered records into the files so the log can go.
+            self.write_snapshot(
+                {
+                    game_id: _dumps(games[game_id])
+                    for game_id in replayed
+                    if isinstance(games.get(game_id), dict)
+                },
+                dropped,
+                self.encode_index(chat_index, join_codes, players),
+            )
+        return games, chat_index, join_codes, players
+
+    def decode(self, raw: RawGame) -> GameState:
+        """Build the :class:`GameState` for a game returned by :meth:`load`."""
+
+        payload = _loads(raw) if isinstance(raw, bytes) else raw
+        game_id = str(payload["game_id"])
+        count = payload.get("turn_count")
+        if count is None:
+            # Older record with the turns inline; they get a turns file on the
+            # next write.
+            self._turns_written[game_id] = 0
+            return _deserialize_state(payload)
+        records, lines = self._read_turns(game_id)
+        state = _deserialize_state(payload, lambda _game_id: records)
+        if lines != len(state.words_used):
+            # Turns appended just before a crash, or a torn last line.
+            self._rewrite_turns(state)
+        self._turns_written[game_id] = len(state.words_used)
+        return state
+
+    def _load_games(self) -> Dict[str, RawGame]:
+        if not self._games_dir.is_dir():
+            return {}
+        paths = list(self._games_dir.glob("*.json"))
+        if len(paths) < PARALLEL_READ_THRESHOLD:
+            blobs = map(_read_game_file, paths)
+            return {path.stem: blob for path, blob in zip(paths, blobs) if blob is not None}
+        # File reads release the GIL, so a few threads overlap the open/read
+        # latency of many small files on a cold start.
+        with ThreadPoolExecutor(max_workers=PARALLEL_READ_WORKERS) as pool:
+            blobs = pool.map(_read_game_file, paths)
+            return {path.stem: blob for path, blob in zip(paths, blobs) if blob is not None}
+
+    def _read_turns(self, game_id: str) -> Tuple[List[TurnRecord], int]:
+        """Return the parsed turns of ``game_id`` and the number of raw lines."""
+
+        path = self._turns_path(game_id)
+        records: List[TurnRecord] = []
+        lines = 0
+        intact = True
+        try:
+            for line in _mapped_lines(path):
+                lines += 1
+                if not intact:
+                    continue
+                try:
+                    records.append(_parse_turn_line(line))
+                except (ValueError, TypeError) as exc:
+                    LOGGER.warning("Skipping malformed Balda turn in %s: %s", path, exc)
+                    intact = False
+        except FileNotFoundError:
+            return [], 0
+        except OSError as exc:
+            LOGGER.error("Failed to read Balda turns from %s: %s", path, exc)
+            return [], 0
+        return records, lines
+
+    def _rewrite_turns(self, state: GameState) -> None:
+        try:
+            _atomic_write(self._turns_path(state.game_id), _encode_turns(state, 0))
+        except OSError as exc:
+            LOGGER.error("Failed to rewrite Balda turns of %s: %s", state.game_id, exc)
+
+    def _load_index(
+        self,
+    ) -> Tuple[Dict[GameKey, str], Dict[str, str], Optional[Dict[int, str]]]:
+        if not self._index_path.exists():
+            return {}, {}, None
+        try:
+            payload = _loads(self._index_path.read_bytes())
+        except (OSError, ValueError) as exc:
+            LOGGER.error("Failed to read Balda index from %s: %s", self._index_path, exc)
+            return {}, {}, None
+        return _parse_index(payload)
+
+    def _read_log(self) -> Iterator[Tuple[str, Dict[str, object]]]:
+        if not self._log_path.exists():
+            return
+        try:
+            for line in _mapped_lines(self._log_path):
+                if not line:
+                    continue
+                try:
+                    record = _loads(line)
+                    op, payload = str(record["t"]), record["p"]
+                except (ValueError, KeyError, TypeError) as exc:
+                    # A torn final line after a crash is expected; skip it.
+                    LOGGER.warning("Skipping malformed Balda log record: %s", exc)
+                    continue
+                yield op, payload
+        except OSError as exc:
+            LOGGER.error("Failed to read Balda operation log %s: %s", self._log_path, exc)
+
+    def _migrate_legacy(self) -> None:
+        """Split a pre-directory ``.balda_state.json`` snapshot into per-game files."""
+
+        legacy = self._legacy_path
+        if legacy is None or not legacy.is_file() or self._index_path.exists():
+            return
+        try:
+            payload = _loads(legacy.read_bytes())
+            games = {
+                game_id: _deserialize_state(data)
+                for game_id, data in payload.get("games", {}).items()
+            }
+            chat_index, join_codes, _ = _parse_index(payload)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            LOGGER.error("Failed to migrate legacy Balda state %s: %s", legacy, exc)
+            return
+        self.dump(games, chat_index, join_codes)
+        try:
+            legacy.replace(legacy.with_suffix(f"{legacy.suffix}.migrated"))
+        except OSError as exc:  # pragma: no cover - defensive logging
+            LOGGER.error("Failed to retire legacy Balda state %s: %s", legacy, exc)
+
+    # Encoding ---------------------------------------------------------
+    def encode_game(self, state: GameState) -> bytes:
+        """Serialize a single game, reusing the bytes until it is invalidated."""
+
+        blob = self._encoded_cache.get(state.game_id)
+        if blob is None:
+            blob = _dumps(_serialize_state(state))
+            self._encoded_cache[state.game_id] = blob
+        return blob
+
+    def invalidate(self, game_id: str) -> None:
+        """Forget the cached encoding of ``game_id`` after it changed."""
+
+        self._encoded_cache.pop(game_id, None)
+
+    def encode_turns(self, state: GameState) -> bytes:
+        """Encode the turns added since the last call and mark them as written."""
+
+        start = self._turns_written.get(state.game_id, 0)
+        count = len(state.words_used)
+        if start >= count:
+            return b""
+        self._turns_written[state.game_id] = count
+        return _encode_turns(state, start)
+
+    def forget(self, game_id: str) -> None:
+        """Drop every cached detail about a removed game."""
+
+        self._encoded_cache.pop(game_id, None)
+        self._turns_written.pop(game_id, None)
+        self._put_digests.pop(game_id, None)
+
+    def encode_index(
+        self,
+        chat_index: Dict[GameKey, str],
+        join_codes: Dict[str, str],
+        players: Dict[int, str],
+    ) -> bytes:
+        """Serialize the chat bindings, join codes and player index."""
+
+        return _dumps(
+            {
+                "chat_index": [
+                    {"chat_id": key >> 32, "thread_id": key & _THREAD_MASK, "game_id": game_id}
+                    for key, game_id in chat_index.items()
+                ],
+                "join_codes": join_codes,
+                "players": players,
+            }
+        )
+
+    def encode_put(
+        self, state: GameState, chat_key: Optional[GameKey], join_code: Optional[str]
+    ) -> bytes:
+        """Encode a log record storing ``state`` together with its bindings.
+
+        Returns ``b""`` when the record is identical to the last one encoded
+        for this game, e.g. after a ``save`` that changed nothing.
+        """
+
+        bindings = _dumps(
+            {
+                "chat_key": list(unpack_chat_key(chat_key)) if chat_key is not None else None,
+                "join_code": join_code,
+            }
+        )
+        record = b'{"t":"put","p":{"game":' + self.encode_game(state) + b"," + bindings[1:] + b"}\n"
+        digest = hashlib.blake2b(record, digest_size=16).digest()
+        if self._put_digests.get(state.game_id) == digest:
+            return b""
+        self._put_digests[state.game_id] = digest
+        return record
+
+    def encode_drop(self, game_id: str) -> bytes:
+        """Encode a log record removing a game and its bindings."""
+
+        return _dumps({"t": "drop", "p": {"game_id": game_id}}) + b"\n"
+
+    # Writing ----------------------------------------------------------
+    def append(
+        self,
+        records: bytes,
+        turns: Optional[Dict[str, bytes]] = None,
+        *,
+        durable: bool = False,
+    ) -> None:
+        """Append new turns and encoded log records.
+
+        Without ``durable`` the data is handed to the OS but not fsynced: it
+        survives a process crash, and the next durable write or snapshot
+        covers a machine crash.
+        """
+
+        try:
+            self._root.mkdir(parents=True, exist_ok=True)
+            # Turns go first so a logged turn_count never exceeds the file.
+            self._append_turns(turns, durable)
+            with self._log_path.open("ab") as handle:
+                handle.write(records)
+                if durable:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+        except OSError as exc:
+            LOGGER.error("Failed to append Balda state to %s: %s", self._log_path, exc)
+
+    def write_snapshot(
+        self,
+        games: Dict[str, bytes],
+        dropped: Iterable[str],
+        index: bytes,
+        turns: Optional[Dict[str, bytes]] = None,
+        *,
+        durable: bool = True,
+    ) -> None:
+        """Rewrite the changed game files and the index, then truncate the log."""
+
+        try:
+            self._games_dir.mkdir(parents=True, exist_ok=True)
+            self._append_turns(turns, durable)
+            for game_id, blob in games.items():
+                _atomic_write(self._game_path(game_id), blob, durable)
+            for game_id in dropped:
+                self._game_path(game_id).unlink(missing_ok=True)
+                self._turns_path(game_id).unlink(missing_ok=True)
+            if durable:
+                _fsync_dir(self._games_dir)
+            _atomic_write(self._index_path, index, durable)
+            if durable:
+                # The log may only go once everything it covered is on disk.
+                _fsync_dir(self._root)
+            self._log_path.unlink(missing_ok=True)
+        except OSError as exc:
+            LOGGER.error("Failed to persist Balda state to %s: %s", self._root, exc)
 
     def dump(
         self,
@@ -171,32 +688,64 @@ class StateStorage:
         chat_index: Dict[GameKey, str],
         join_codes: Dict[str, str],
     ) -> None:
-        """Write the in-memory state to disk."""
-
-        payload = {
-            "games": {game_id: _serialize_state(state) for game_id, state in games.items()},
-            "chat_index": [
-                {"chat_id": chat_id, "thread_id": thread_id, "game_id": game_id}
-                for (chat_id, thread_id), game_id in chat_index.items()
-            ],
-            "join_codes": join_codes,
-        }
+        """Write a full snapshot, removing files of games that no longer exist."""
+
+        stale = [
+            path.stem for path in self._games_dir.glob("*.json") if path.stem not in games
+        ] if self._games_dir.is_dir() else []
+        players: Dict[int, str] = {}
+        # Turn files are written before write_snapshot gets to create the directory.
         try:
-            self._path.parent.mkdir(parents=True, exist_ok=True)
-            tmp_path = self._path.with_suffix(f"{self._path.suffix}.tmp")
-            tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-            tmp_path.replace(self._path)
+            self._games_dir.mkdir(parents=True, exist_ok=True)
         except OSError as exc:
-            LOGGER.error("Failed to persist Balda state to %s: %s", self._path, exc)
+            LOGGER.error("Failed to create Balda games directory %s: %s", self._games_dir, exc)
+        for state in games.values():
+            self._rewrite_turns(state)
+            self._turns_written[state.game_id] = len(state.words_used)
+            players.update(dict.fromkeys(state.players, state.game_id))
+        self.write_snapshot(
+            {game_id: self.encode_game(state) for game_id, state in games.items()},
+            stale,
+            self.encode_index(chat_index, join_codes, players),
+        )
 
     def clear(self) -> None:
-        """Remove the persisted state file entirely."""
+        """Remove every persisted game file, the index and the operation log."""
 
-        try:
-            if self._path.exists():
-                self._path.unlink()
-        except OSError as exc:
-            LOGGER.error("Failed to delete Balda state file %s: %s", self._path, exc)
+        self._encoded_cache.clear()
+        self._turns_written.clear()
+        self._put_digests.clear()
+        paths = list(self._games_dir.iterdir()) if self._games_dir.is_dir() else []
+        for path in [*paths, self._index_path, self._log_path]:
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as exc:
+                LOGGER.error("Failed to delete Balda state file %s: %s", path, exc)
+
+    def _append_turns(self, turns: Optional[Dict[str, bytes]], durable: bool) -> None:
+        if not turns:
+            return
+        self._games_dir.mkdir(parents=True, exist_ok=True)
+        for game_id, lines in turns.items():
+            if not lines:
+                continue
+            with self._turns_path(game_id).open("ab") as handle:
+                handle.write(lines)
+                if durable:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+
+    def _game_path(self, game_id: str) -> Path:
+        return self._games_dir / f"{game_id}.json"
+
+    def _turns_path(self, game_id: str) -> Path:
+        return self._games_dir / f"{game_id}.turns.jsonl"
 
 
-__all__ = ["StateStorage", "DEFAULT_STATE_PATH"]
+__all__ = [
+    "StateStorage",
+    "DEFAULT_STATE_PATH",
+    "LEGACY_STATE_PATH",
+    "pack_chat_key",
+    "unpack_chat_key",
+]
@@ -1,18 +1,22 @@
 import asyncio
+import base64
 import json
 import os
 import random
 import secrets
 import logging
 import html
-from time import perf_counter
+import marshal
+import re
+from time import monotonic, perf_counter
 from collections import Counter
+from functools import lru_cache
 from dataclasses import dataclass, field
 from pathlib import Path
 from datetime import datetime
-from typing import Callable, Dict, Optional, Set, List, Tuple
+from typing import Callable, Dict, Iterable, Optional, Set, List, Tuple
 
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Response
 from fastapi.responses import JSONResponse
 from telegram import (
     BotCommand,
@@ -28,6 +32,7 @@ from telegram import (
 )
 from telegram import Update
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     ApplicationHandlerStop,
     CallbackContext,
@@ -38,6 +43,11 @@ from telegram.ext import (
     filters,
 )
 from telegram.error import BadRequest, Forbidden, TelegramError
+
+try:  # orjson speeds up the dictionary load; stdlib json is the fallback.
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
 from llm_utils import describe_word
 from shared.choice_timer import ChoiceTimerHandle, send_choice_with_timer
 from shared.logging_utils import configure_logging
@@ -48,6 +58,9 @@ from shared.word_stats import get_zipf
 BASE_DIR = Path(__file__).resolve().parent.parent
 DICT_PATH = BASE_DIR / "nouns_ru_pymorphy2_yaspeller.jsonl"
 WHITELIST_PATH = BASE_DIR / "whitelist.jsonl"
+# Parsed dictionary snapshot, reused while the source files are unchanged
+DICT_CACHE_PATH = BASE_DIR / ".compose_dict.cache"
+DICT_CACHE_VERSION = 1
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
@@ -56,44 +69,147 @@ WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", secrets.token_hex())
 configure_logging(level=LOG_LEVEL, extra_values=[TOKEN, WEBHOOK_SECRET])
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1 << 14)
 def normalize_word(word: str) -> str:
     """Normalize words: lowercase and replace ё with е."""
+    if "ё" not in word and word.islower():
+        return word
     return word.lower().replace("ё", "е")
 
 
+# Entities produced by html.escape are matched first so their letters stay intact.
+_BOLD_ALNUM_RE = re.compile(r"(&(?:amp|lt|gt|quot|#x27);)|[^\W_]")
+
+
+def _bold_match(match: "re.Match[str]") -> str:
+    if match.group(1):
+        return match.group(1)
+    return f"<b>{match.group(0)}</b>"
+
+
+@lru_cache(maxsize=256)
 def bold_alnum(text: str) -> str:
     """Wrap alphanumeric characters in bold tags for HTML parse mode."""
-    return "".join(
-        f"<b>{html.escape(ch)}</b>" if ch.isalnum() else html.escape(ch)
-        for ch in text
-    )
+    return _BOLD_ALNUM_RE.sub(_bold_match, html.escape(text))
+
+
+def _dictionary_sources() -> List[Tuple[str, int, int]]:
+    """Return (path, mtime_ns, size) for every dictionary file that exists."""
+    sources = []
+    for path in (DICT_PATH, WHITELIST_PATH):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        sources.append((str(path), st.st_mtime_ns, st.st_size))
+    return sources
+
+
+def _read_dictionary_cache(sources: List[Tuple[str, int, int]]) -> Optional[List[str]]:
+    """Return cached words if the snapshot was built from ``sources``."""
+    try:
+        version, cached_sources, words = marshal.loads(DICT_CACHE_PATH.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != DICT_CACHE_VERSION or cached_sources != sources:
+        return None
+    return words
+
+
+def _write_dictionary_cache(sources: List[Tuple[str, int, int]], words: Set[str]) -> None:
+    tmp_path = DICT_CACHE_PATH.with_name(DICT_CACHE_PATH.name + ".tmp")
+    try:
+        tmp_path.write_bytes(marshal.dumps((DICT_CACHE_VERSION, sources, list(words))))
+        os.replace(tmp_path, DICT_CACHE_PATH)
+    except OSError as exc:
+        logger.debug("Failed to write dictionary cache: %s", exc)
 
 
 # Load dictionary at startup (main + whitelist)
+_json_loads = orjson.loads if orjson is not None else json.loads
 DICT: Set[str] = set()
-for path in (DICT_PATH, WHITELIST_PATH):
-    if not path.exists():
-        continue
-    for line in path.read_text(encoding="utf-8").splitlines():
-        try:
-            data = json.loads(line)
-            DICT.add(normalize_word(data["word"]))
-        except Exception:
+_dict_sources = _dictionary_sources()
+_cached_words = _read_dictionary_cache(_dict_sources)
+if _cached_words is not None:
+    DICT.update(_cached_words)
+else:
+    for path in (DICT_PATH, WHITELIST_PATH):
+        if not path.exists():
             continue
+        with path.open("rb") as f:
+            for line in f:
+                try:
+                    data = _json_loads(line)
+                    # Each dictionary word is seen once; keep it out of the cache.
+                    DICT.add(normalize_word.__wrapped__(data["word"]))
+                except Exception:
+                    continue
+    if _dict_sources:
+        _write_dictionary_cache(_dict_sources, DICT)
+del _cached_words
+
+# Random base-word candidates by the minimum length base_choice asks for.
+# Built once after DICT is loaded; code that swaps the dictionary afterwards
+# calls rebuild_base_candidates().
+CANDIDATES_GE8: Tuple[str, ...] = ()
+CANDIDATES_GE9: Tuple[str, ...] = ()
+CANDIDATES_GE10: Tuple[str, ...] = ()
 
 
-def is_cyrillic(word: str) -> bool:
-    return all("а" <= ch <= "я" or ch == "ё" for ch in word.lower())
+def rebuild_base_candidates() -> None:
+    """Recompute the base-word candidate tuples from the current ``DICT``."""
+    global CANDIDATES_GE8, CANDIDATES_GE9, CANDIDATES_GE10
+    long_words = [w for w in DICT if len(w) >= 8]
+    CANDIDATES_GE8 = tuple(long_words)
+    CANDIDATES_GE9 = tuple(w for w in long_words if len(w) >= 9)
+    CANDIDATES_GE10 = tuple(w for w in long_words if len(w) >= 10)
+
+
+def base_candidates(time_limit: float, player_count: int) -> Tuple[str, ...]:
+    """Return random base-word candidates for the given game settings."""
+    if time_limit >= 5:
+        return CANDIDATES_GE10
+    if player_count >= 3:
+        return CANDIDATES_GE9
+    return CANDIDATES_GE8
+
+
+rebuild_base_candidates()
+
+
+# A normalized submission: three or more lowercase Cyrillic letters.
+_SUBMISSION_RE = re.compile(r"[а-яё]{3,}")
+
+
+def is_submittable(word: str) -> bool:
+    """Return True if a normalized word passes the alphabet and length rule."""
+    return _SUBMISSION_RE.fullmatch(word) is not None
 
 
 def can_make(word: str, letters: Counter) -> bool:
-    c = Counter(word)
-    for k, v in c.items():
-        if letters.get(k, 0) < v:
+    need: Dict[str, int] = {}
+    for ch in word:
+        n = need.get(ch, 0) + 1
+        if n > letters.get(ch, 0):
             return False
+        need[ch] = n
     return True
 
 
+def playable_words(letters: Counter) -> Set[str]:
+    """Return every dictionary word of 3+ letters that can be built from ``letters``."""
+    available = set(letters)
+    return {
+        w
+        for w in DICT
+        if len(w) >= 3 and available.issuperset(w) and can_make(w, letters)
+    }
+
+
+# Words this long score two points and get a broadcast announcement.
+LONG_WORD_LEN = 6
+
+
 # --- Data classes ----------------------------------------------------------
 
 @dataclass
@@ -120,12 +236,21 @@ class GameState:
     base_msg_counts: Dict[Tuple[int, int], int] = field(default_factory=dict)
     invite_keyboard_hidden: bool = False
     word_history: List[Tuple[int, str]] = field(default_factory=list)
+    # Dictionary words playable with the current base word (see set_base_word)
+    valid_words: Set[str] = field(default_factory=set)
 
 
 ACTIVE_GAMES: Dict[str, GameState] = {}
 JOIN_CODES: Dict[str, str] = {}
+# Reverse of JOIN_CODES: game_id -> its invite code
+GAME_TO_CODE: Dict[str, str] = {}
 BASE_MSG_IDS: Dict[str, int] = {}
 LAST_REFRESH: Dict[Tuple[int, int], float] = {}
+# Past this many entries, refresh stamps older than the TTL are pruned
+LAST_REFRESH_MAX = 1024
+LAST_REFRESH_TTL = 600
+# Base-button refreshes still in flight, by (chat_id, thread_id)
+REFRESH_TASKS: Dict[Tuple[int, int], "asyncio.Task[None]"] = {}
 # Map player chat (chat_id, thread_id) to game_id for quick lookup
 CHAT_GAMES: Dict[Tuple[int, int], str] = {}
 # Track users from whom the game currently expects a name
@@ -145,15 +270,65 @@ class AwaitingComposeNameFilter(filters.MessageFilter):
 AWAITING_COMPOSE_NAME_FILTER = AwaitingComposeNameFilter()
 
 
+# Game ids and invite codes are drawn in batches to amortize os.urandom calls.
+TOKEN_BATCH = 256
+_TOKEN_POOL: List[str] = []
+
+
+def new_token() -> str:
+    """Return a fresh URL-safe random token for a game id or invite code."""
+    if not _TOKEN_POOL:
+        # Same shape as secrets.token_urlsafe(8): 8 random bytes, unpadded base64.
+        raw = secrets.token_bytes(8 * TOKEN_BATCH)
+        _TOKEN_POOL.extend(
+            base64.urlsafe_b64encode(raw[i : i + 8]).rstrip(b"=").decode("ascii")
+            for i in range(0, len(raw), 8)
+        )
+    return _TOKEN_POOL.pop()
+
+
+def join_code_for(game_id: str) -> str:
+    """Return the game's invite code, creating one on first use."""
+    code = GAME_TO_CODE.get(game_id)
+    if code and JOIN_CODES.get(code) == game_id:
+        return code
+    code = new_token()
+    JOIN_CODES[code] = game_id
+    GAME_TO_CODE[game_id] = code
+    return code
+
+
+def drop_join_code(game_id: str) -> None:
+    """Forget the game's invite code, if it has one."""
+    code = GAME_TO_CODE.pop(game_id, None)
+    if code and JOIN_CODES.get(code) == game_id:
+        del JOIN_CODES[code]
+
+
+def unlink_game_chats(game_id: str, chat_ids: Iterable[int]) -> None:
+    """Drop the ``CHAT_GAMES`` entries of ``chat_ids`` that still point at the game.
+
+    A player may already have moved on to another game from the same chat;
+    that newer mapping is left alone.
+    """
+    for cid in chat_ids:
+        if CHAT_GAMES.get((cid, 0)) == game_id:
+            del CHAT_GAMES[(cid, 0)]
+
+
 def get_game(chat_id: int, thread_id: Optional[int]) -> Optional[GameState]:
-    """Retrieve a game by chat/thread identifier."""
-    key = (chat_id, thread_id or 0)
-    game_id = CHAT_GAMES.get(key)
+    """Retrieve a game by chat/thread identifier.
+
+    ``CHAT_GAMES`` is updated wherever a chat joins a game, so the lookup is
+    one or two dict accesses; thread-specific keys fall back to the chat key.
+    """
+    if thread_id:
+        game = ACTIVE_GAMES.get(CHAT_GAMES.get((chat_id, thread_id)))
+        if game:
+            return game
+    game_id = CHAT_GAMES.get((chat_id, 0))
     if game_id:
         return ACTIVE_GAMES.get(game_id)
-    for g in ACTIVE_GAMES.values():
-        if chat_id in g.player_chats.values():
-            return g
     return None
 
 
@@ -170,17 +345,21 @@ async def broadcast(
     game = ACTIVE_GAMES.get(game_id)
     if not game:
         return
-    sent: Set[int] = set()
-    for cid in game.player_chats.values():
-        if cid == skip_chat_id or cid in sent:
-            continue
+    bot = APPLICATION.bot
+
+    async def send(cid: int) -> None:
         try:
-            await APPLICATION.bot.send_message(
+            await bot.send_message(
                 cid, text, reply_markup=reply_markup, parse_mode=parse_mode
             )
         except TelegramError:
             pass
-        sent.add(cid)
+
+    # Each chat gets one message; chats are independent, so send concurrently.
+    chats = dict.fromkeys(game.player_chats.values())
+    chats.pop(skip_chat_id, None)
+    if chats:
+        await asyncio.gather(*(send(cid) for cid in chats))
 
 
 async def refresh_base_button(chat_id: int, thread_id: int, context: CallbackContext) -> None:
@@ -216,23 +395,43 @@ async def refresh_base_button(chat_id: int, thread_id: int, context: CallbackCon
 
 def schedule_refresh_base_button(chat_id: int, thread_id: int, context: CallbackContext) -> None:
     """Throttle refresh of the base word button to avoid blocking."""
-    now = asyncio.get_event_loop().time()
-    key = (chat_id, thread_id or 0)
+    now = monotonic()
+    thread_id = thread_id or 0
+    key = (chat_id, thread_id)
     last = LAST_REFRESH.get(key, 0)
     if now - last < 1:
         return
+    pending = REFRESH_TASKS.get(key)
+    if pending is not None and not pending.done():
+        # A slow refresh is still resending the button; it will end up last anyway.
+        return
+    # Re-insert so entries stay ordered by refresh time, oldest first.
+    LAST_REFRESH.pop(key, None)
     LAST_REFRESH[key] = now
-    asyncio.create_task(refresh_base_button(chat_id, thread_id or 0, context))
+    if len(LAST_REFRESH) > LAST_REFRESH_MAX:
+        cutoff = now - LAST_REFRESH_TTL
+        stale = []
+        for old_key, stamp in LAST_REFRESH.items():
+            if stamp >= cutoff:
+                break
+            stale.append(old_key)
+        for old_key in stale:
+            del LAST_REFRESH[old_key]
+    task = asyncio.create_task(refresh_base_button(chat_id, thread_id, context))
+    REFRESH_TASKS[key] = task
+
+    def _done(finished: "asyncio.Task[None]") -> None:
+        if REFRESH_TASKS.get(key) is finished:
+            del REFRESH_TASKS[key]
+
+    task.add_done_callback(_done)
 
 
 INVISIBLE_MESSAGE = "\u2063"
 
 
 async def send_game_message(chat_id: int, thread_id: Optional[int], context: CallbackContext, text: str, **kwargs):
-    if thread_id is None:
-        msg = await context.bot.send_message(chat_id, text, **kwargs)
-    else:
-        msg = await context.bot.send_message(chat_id, text, message_thread_id=thread_id, **kwargs)
+    msg = await context.bot.send_message(chat_id, text, message_thread_id=thread_id, **kwargs)
     schedule_refresh_base_button(chat_id, thread_id or 0, context)
     return msg
 
@@ -285,11 +484,7 @@ async def awaiting_name_guard(
 ) -> None:
     """Ensure the user provides a name before processing commands."""
     user = update.effective_user
-    user_id = user.id if user else None
-    awaiting = bool(user_id and user_id in AWAITING_NAME_USERS)
-    if not awaiting:
-        awaiting = context.user_data.get("awaiting_name", False)
-    if not awaiting:
+    if not user or not is_awaiting_name(context, user.id):
         return
     message = update.effective_message
     if not message:
@@ -319,6 +514,51 @@ PUBLIC_URL = os.environ.get("PUBLIC_URL")
 WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/webhook")
 ALLOWED_UPDATES = ["message", "callback_query", "users_shared"]
 
+# Recurring menus; PTB objects are frozen after construction, so they are shared.
+_TIME_ROW = (
+    InlineKeyboardButton("3 минуты", callback_data="time_3"),
+    InlineKeyboardButton("5 минут", callback_data="time_5"),
+)
+TIME_MENU = InlineKeyboardMarkup([_TIME_ROW])
+TIME_MENU_ADMIN = InlineKeyboardMarkup(
+    [_TIME_ROW, [InlineKeyboardButton("[адм.] Тестовая игра", callback_data="adm_test")]]
+)
+BASE_MENU = InlineKeyboardMarkup(
+    [
+        [
+            InlineKeyboardButton("Вручную", callback_data="base_manual"),
+            InlineKeyboardButton("Случайное", callback_data="base_random"),
+        ]
+    ]
+)
+START_MENU = InlineKeyboardMarkup([[InlineKeyboardButton("Старт", callback_data="start")]])
+RESTART_MENU = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton("Новая игра с теми же участниками", callback_data="restart_yes")],
+        [InlineKeyboardButton("Новая игра с другими участниками", callback_data="restart_no")],
+    ]
+)
+
+
+def time_menu(user_id: int) -> InlineKeyboardMarkup:
+    """Return the game duration menu, with the admin test option for the admin."""
+    return TIME_MENU_ADMIN if user_id == ADMIN_ID else TIME_MENU
+
+
+def is_awaiting_name(context: CallbackContext, user_id: int) -> bool:
+    """Return whether ``user_id`` still has to enter a name.
+
+    ``AWAITING_NAME_USERS`` answers almost every call; the user_data flags only
+    matter when the in-memory set was lost, e.g. after a restart.
+    """
+    if user_id in AWAITING_NAME_USERS:
+        return True
+    if context.user_data.get("awaiting_name", False):
+        return True
+    if context.application:
+        return bool(context.application.user_data.get(user_id, {}).get("awaiting_name", False))
+    return False
+
 
 def mark_awaiting_name(context: CallbackContext, user_id: int) -> None:
     AWAITING_NAME_USERS.add(user_id)
@@ -351,8 +591,8 @@ async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     message = update.effective_message
     chat_id = update.effective_chat.id
     code = context.args[0] if context.args else None
-    if code and code in JOIN_CODES:
-        gid = JOIN_CODES[code]
+    gid = JOIN_CODES.get(code) if code else None
+    if gid:
         game = ACTIVE_GAMES.get(gid)
         if game:
             await add_player_via_invite(update.effective_user, game, context)
@@ -394,7 +634,7 @@ async def request_name(user_id: int, chat_id: int, context: CallbackContext) ->
 
 def create_dm_game(host_id: int) -> GameState:
     """Create a direct-message game for the host."""
-    game_id = secrets.token_urlsafe(8)
+    game_id = new_token()
     game = GameState(host_id=host_id, game_id=game_id)
     game.players[host_id] = Player(user_id=host_id)
     game.player_chats[host_id] = host_id
@@ -435,14 +675,7 @@ async def maybe_show_base_options(
             thread_id,
             context,
             "Выберите базовое слово:",
-            reply_markup=InlineKeyboardMarkup(
-                [
-                    [
-                        InlineKeyboardButton("Вручную", callback_data="base_manual"),
-                        InlineKeyboardButton("Случайное", callback_data="base_random"),
-                    ]
-                ]
-            ),
+            reply_markup=BASE_MENU,
         )
 
 
@@ -452,17 +685,7 @@ async def handle_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         return
     user_id = user.id
     message = update.message or update.effective_message
-    awaiting = user_id in AWAITING_NAME_USERS
-    if not awaiting:
-        awaiting = context.user_data.get("awaiting_name", False)
-        if not awaiting and context.application:
-            storage = getattr(context.application, "_user_data", None)
-            if storage is not None:
-                awaiting = storage.get(user_id, {}).get("awaiting_name", False)
-            else:
-                awaiting = context.application.user_data.get(user_id, {}).get(
-                    "awaiting_name", False
-                )
+    awaiting = is_awaiting_name(context, user_id)
     logger.debug("NAME: entered, awaiting=%s", awaiting)
     if not awaiting:
         return
@@ -538,21 +761,11 @@ async def handle_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             game.game_id,
         )
         if user_id == game.host_id and game.status == "config":
-            buttons = [
-                [
-                    InlineKeyboardButton("3 минуты", callback_data="time_3"),
-                    InlineKeyboardButton("5 минут", callback_data="time_5"),
-                ]
-            ]
-            if user_id == ADMIN_ID:
-                buttons.append(
-                    [InlineKeyboardButton("[адм.] Тестовая игра", callback_data="adm_test")]
-                )
             await reply_game_message(
                 message,
                 context,
                 "Выберите длительность игры:",
-                reply_markup=InlineKeyboardMarkup(buttons),
+                reply_markup=time_menu(user_id),
             )
         host_chat = game.player_chats.get(game.host_id)
         if host_chat:
@@ -575,12 +788,10 @@ async def time_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             if gid == game.game_id:
                 continue
             if chat_id in g.player_chats.values():
-                for cid in set(g.player_chats.values()):
-                    CHAT_GAMES.pop((cid, 0), None)
+                # The test game has just claimed (chat_id, 0) for itself.
+                unlink_game_chats(gid, g.player_chats.values())
                 BASE_MSG_IDS.pop(gid, None)
-                for code, cg in list(JOIN_CODES.items()):
-                    if cg == gid:
-                        JOIN_CODES.pop(code, None)
+                drop_join_code(gid)
                 ACTIVE_GAMES.pop(gid, None)
         game.players[query.from_user.id].name = context.user_data.get("name", "")
         game.time_limit = 1.5
@@ -608,19 +819,14 @@ async def time_selected(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         game.time_limit = int(query.data.split("_")[1])
         game.status = "waiting"
         if len(game.players) >= 2 and all(p.name for p in game.players.values()):
-            code = next((c for c, gid in JOIN_CODES.items() if gid == game.game_id), None)
-            if code:
-                JOIN_CODES.pop(code, None)
+            drop_join_code(game.game_id)
             if not game.invite_keyboard_hidden:
                 await hide_invite_keyboard(chat_id, thread_id, context)
                 game.invite_keyboard_hidden = True
             await query.edit_message_text("Длительность установлена")
             await maybe_show_base_options(chat_id, thread_id, context, game)
             return
-        code = next((c for c, gid in JOIN_CODES.items() if gid == game.game_id), None)
-        if not code:
-            code = secrets.token_urlsafe(8)
-            JOIN_CODES[code] = game.game_id
+        code = join_code_for(game.game_id)
         await query.edit_message_text("Игра создана. Пригласите участников.")
         keyboard = ReplyKeyboardMarkup(
             [
@@ -720,10 +926,7 @@ async def invite_link(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
                 "Игра не найдена, начните заново командой /start",
             )
             return
-    code = next((c for c, gid in JOIN_CODES.items() if gid == game.game_id), None)
-    if not code:
-        code = secrets.token_urlsafe(8)
-        JOIN_CODES[code] = game.game_id
+    code = join_code_for(game.game_id)
     await reply_game_message(
         message,
         context,
@@ -741,10 +944,7 @@ async def users_shared_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     game = get_game(chat_id, thread_id or 0)
     if not game:
         return
-    code = next((c for c, gid in JOIN_CODES.items() if gid == game.game_id), None)
-    if not code:
-        code = secrets.token_urlsafe(8)
-        JOIN_CODES[code] = game.game_id
+    code = join_code_for(game.game_id)
     link = f"https://t.me/{BOT_USERNAME}?start={code}"
     delivered: List[str] = []
     permanent_failures: List[Tuple[str, str]] = []
@@ -765,6 +965,7 @@ async def users_shared_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             name_parts = f"ID {user_id}" if user_id is not None else "неизвестный пользователь"
         return name_parts
 
+    recipients: List[Tuple[str, int]] = []
     for u in shared.users:
         user_label = format_shared_user(u)
         user_id = getattr(u, "user_id", None)
@@ -777,24 +978,37 @@ async def users_shared_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             )
             permanent_failures.append((user_label, reason))
             continue
-        try:
-            await context.bot.send_message(user_id, f"Приглашение в игру: {link}")
+        recipients.append((user_label, user_id))
+
+    # Invites go to independent chats, so send them all at once and sort the
+    # outcomes afterwards in the order the users were shared.
+    invite_text = f"Приглашение в игру: {link}"
+    results = await asyncio.gather(
+        *(context.bot.send_message(user_id, invite_text) for _, user_id in recipients),
+        return_exceptions=True,
+    )
+    for (user_label, user_id), result in zip(recipients, results):
+        if not isinstance(result, BaseException):
             game.invited_users.add(user_id)
             delivered.append(user_label)
-        except (Forbidden, BadRequest) as exc:
-            logger.warning("Failed to deliver invite to %s: %s", user_label, exc)
-            reason = str(exc)
-            if isinstance(exc, Forbidden) and "initiate conversation" in reason:
+        elif isinstance(result, (Forbidden, BadRequest)):
+            logger.warning("Failed to deliver invite to %s: %s", user_label, result)
+            reason = str(result)
+            if isinstance(result, Forbidden) and "initiate conversation" in reason:
                 reason = (
                     "Telegram запрещает боту писать первым. Попросите игрока открыть бота по ссылке."
                 )
             permanent_failures.append((user_label, reason))
-        except TelegramError as exc:
-            logger.warning("Temporary error delivering invite to %s: %s", user_label, exc)
-            transient_failures.append((user_label, str(exc)))
-        except Exception as exc:  # pragma: no cover - safeguard for unexpected errors
-            logger.exception("Unexpected error delivering invite to %s", user_label)
-            transient_failures.append((user_label, str(exc)))
+        elif isinstance(result, TelegramError):
+            logger.warning("Temporary error delivering invite to %s: %s", user_label, result)
+            transient_failures.append((user_label, str(result)))
+        elif isinstance(result, Exception):  # pragma: no cover - safeguard for unexpected errors
+            logger.error(
+                "Unexpected error delivering invite to %s", user_label, exc_info=result
+            )
+            transient_failures.append((user_label, str(result)))
+        else:
+            raise result
 
     response_lines: List[str] = []
     if delivered:
@@ -858,8 +1072,8 @@ async def quit_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     for user_id in list(game.players.keys()):
         clear_awaiting_name(context, user_id)
     BASE_MSG_IDS.pop(game.game_id, None)
-    for cid in set(game.player_chats.values()):
-        CHAT_GAMES.pop((cid, 0), None)
+    unlink_game_chats(game.game_id, game.player_chats.values())
+    drop_join_code(game.game_id)
     ACTIVE_GAMES.pop(game.game_id, None)
 
 
@@ -915,14 +1129,11 @@ async def reset_for_chat(chat_id: int, user_id: int, context: CallbackContext) -
         for key in related_keys:
             LAST_REFRESH.pop(key, None)
 
+        unlink_game_chats(gid, related_chats)
         for cid in related_chats:
-            CHAT_GAMES.pop((cid, 0), None)
             LAST_REFRESH.pop((cid, 0), None)
 
-        for code, stored_gid in list(JOIN_CODES.items()):
-            if stored_gid == gid:
-                JOIN_CODES.pop(code, None)
-
+        drop_join_code(gid)
         ACTIVE_GAMES.pop(gid, None)
 
 
@@ -946,11 +1157,7 @@ async def base_choice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     if query.data == "base_manual":
         await reply_game_message(query.message, context, "Введите базовое слово (>=8 букв):", reply_markup=ForceReply())
     elif query.data == "base_random":
-        candidates = [w for w in DICT if len(w) >= 8]
-        if game.time_limit >= 5:
-            candidates = [w for w in candidates if len(w) >= 10]
-        if len(game.players) >= 3:
-            candidates = [w for w in candidates if len(w) >= 9]
+        candidates = base_candidates(game.time_limit, len(game.players))
         if len(candidates) < 3:
             await reply_game_message(
                 query.message,
@@ -1070,6 +1277,7 @@ async def set_base_word(chat_id: int, thread_id: int, word: str, context: Callba
         return
     game.base_word = normalize_word(word)
     game.letters = Counter(game.base_word)
+    game.valid_words = playable_words(game.letters)
     message = (
         f"{bold_alnum(chosen_by)} выбрал слово {html.escape(game.base_word)}"
         if chosen_by
@@ -1079,7 +1287,7 @@ async def set_base_word(chat_id: int, thread_id: int, word: str, context: Callba
     await broadcast(
         game.game_id,
         "Нажмите Старт, когда будете готовы",
-        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("Старт", callback_data="start")]]),
+        reply_markup=START_MENU,
     )
 
 
@@ -1195,7 +1403,7 @@ async def end_game(context: CallbackContext) -> None:
                 await request_name(p.user_id, chat, context)
         return
     game.status = "finished"
-    msg_id = BASE_MSG_IDS.get(game.game_id)
+    msg_id = BASE_MSG_IDS.pop(game.game_id, None)
     if msg_id:
         try:
             await context.bot.delete_message(chat_id, msg_id)
@@ -1211,6 +1419,8 @@ async def end_game(context: CallbackContext) -> None:
 
     max_score = players_sorted[0].points if players_sorted else 0
     winners = [p for p in players_sorted if p.points == max_score]
+    # Escape each display name once; it is reused in the table and winner line.
+    names = {p.user_id: html.escape(format_name(p)) for p in players_sorted}
 
     lines = [
         "<b>Игра окончена!</b>",
@@ -1219,48 +1429,34 @@ async def end_game(context: CallbackContext) -> None:
         f"<b>Слово:</b> {html.escape(game.base_word.upper())}",
         "",
     ]
+    append = lines.append
     for p in players_sorted:
-        lines.append(html.escape(format_name(p)))
-        for i, w in enumerate(p.words, 1):
-            pts = 2 if len(w) >= 6 else 1
-            lines.append(f"{i}. {html.escape(w)} — {pts}")
-        lines.append(f"<b>Результат:</b> {p.points}")
-        lines.append("")
+        append(names[p.user_id])
+        lines.extend(
+            f"{i}. {html.escape(w)} — {2 if len(w) >= LONG_WORD_LEN else 1}"
+            for i, w in enumerate(p.words, 1)
+        )
+        append(f"<b>Результат:</b> {p.points}")
+        append("")
 
     if winners:
         if not lines or lines[-1] != "":
             lines.append("")
         if len(winners) == 1:
-            lines.append(
-                f"🏆 <b>Победитель:</b> {html.escape(format_name(winners[0]))}"
-            )
+            lines.append(f"🏆 <b>Победитель:</b> {names[winners[0].user_id]}")
         else:
             lines.append(
                 "🏆 <b>Победители:</b> "
-                + ", ".join(html.escape(format_name(p)) for p in winners)
+                + ", ".join(names[p.user_id] for p in winners)
             )
     message = "\n".join(lines).rstrip()
     await broadcast(game.game_id, message, parse_mode="HTML")
     stats_message = build_compose_stats_message(game, format_name)
     await broadcast(game.game_id, stats_message, parse_mode="HTML")
-    keyboard = InlineKeyboardMarkup(
-        [
-            [
-                InlineKeyboardButton(
-                    "Новая игра с теми же участниками", callback_data="restart_yes"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    "Новая игра с другими участниками", callback_data="restart_no"
-                )
-            ],
-        ]
-    )
     await broadcast(
         game.game_id,
         "Выберите, как продолжить игру:",
-        reply_markup=keyboard,
+        reply_markup=RESTART_MENU,
         parse_mode="HTML",
     )
     choice_handle = game.jobs.pop("base_choice", None)
@@ -1281,6 +1477,7 @@ async def reset_game(game: GameState) -> None:
     game.used_words.clear()
     game.base_word = ""
     game.letters.clear()
+    game.valid_words.clear()
     game.status = "config"
     game.word_history.clear()
     choice_handle = game.jobs.pop("base_choice", None)
@@ -1310,19 +1507,11 @@ async def restart_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await reset_game(game)
         BASE_MSG_IDS.pop(game.game_id, None)
         await query.edit_message_text("Игра перезапущена.")
-        buttons = [
-            [
-                InlineKeyboardButton("3 минуты", callback_data="time_3"),
-                InlineKeyboardButton("5 минут", callback_data="time_5"),
-            ]
-        ]
-        if query.from_user.id == ADMIN_ID:
-            buttons.append([InlineKeyboardButton("[адм.] Тестовая игра", callback_data="adm_test")])
         await reply_game_message(
             query.message,
             context,
             "Выберите длительность игры:",
-            reply_markup=InlineKeyboardMarkup(buttons),
+            reply_markup=time_menu(query.from_user.id),
         )
     else:
         text = final_text
@@ -1337,8 +1526,8 @@ async def restart_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             except TelegramError:
                 pass
             sent.add(cid)
-        for cid in set(game.player_chats.values()):
-            CHAT_GAMES.pop((cid, 0), None)
+        unlink_game_chats(game.game_id, game.player_chats.values())
+        drop_join_code(game.game_id)
         ACTIVE_GAMES.pop(game.game_id, None)
 
 async def question_word(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1400,39 +1589,88 @@ async def question_word(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     raise ApplicationHandlerStop
 
 
+# Announcements for long words; formatted only after one is picked.
+LONG_WORD_PHRASES: Tuple[str, ...] = (
+    "🔥 {name} жжёт! Прилетело слово из {length} букв.",
+    "{name} выдает красоту ✨: слово из {length} букв!",
+    "🥊 {name} в ударе! Словечко на {length} букв.",
+    "💣 Да это ж бомба! Слово из {length} букв от игрока {name}.",
+    "😎 Лови стиль: {name} выкатывает слово на {length} букв.",
+    "Ход короля! 👑 {name} выкладывает слово из {length} букв.",
+)
+
+
+def judge_word(game: GameState, player: Player, w: str) -> Tuple[str, Optional[str]]:
+    """Check and record one submitted word.
+
+    Returns the reply for the player and, for an accepted word, the
+    announcement to broadcast ("" when there is none); ``None`` in the second
+    slot means the word was rejected.
+    """
+    if not is_submittable(w):
+        return f"Отклонено: {w} (принимаются слова из 3 букв и длиннее)", None
+    # used_words holds every player's words, so only a hit needs the list scan.
+    if w in game.used_words:
+        if w in player.words:
+            return f"Отклонено: {w} (вы уже использовали это слово)", None
+        return f"Отклонено: {w} (уже использовано другим игроком)", None
+    if w not in game.valid_words:
+        if w not in DICT:
+            return f"Отклонено: {w} (такого слова нет в словаре)", None
+        if not can_make(w, game.letters):
+            return f"Отклонено: {w} (нет таких букв)", None
+    game.used_words.add(w)
+    player.words.append(w)
+    game.word_history.append((player.user_id, w))
+    length = len(w)
+    if length >= LONG_WORD_LEN:
+        player.points += 2
+        return (
+            f"Зачтено: {w}\nБраво! Вы получили 2 очка за это слово. 🤩",
+            random.choice(LONG_WORD_PHRASES).format(name=player.name, length=length),
+        )
+    player.points += 1
+    return f"Зачтено: {w}", ""
+
+
 async def word_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     start_ts = perf_counter()
+    # Decided once per update so disabled debug logs cost no argument building.
+    debug = logger.isEnabledFor(logging.DEBUG)
+    # effective_* are computed properties on Update; read each one once.
+    chat = update.effective_chat
+    effective_message = update.effective_message
+    user = update.effective_user
     # временный INFO-лог для подтверждения запуска обработчика
-    try:
+    if logger.isEnabledFor(logging.INFO):
         logger.info(
             "word_message START chat_id=%s user=%s text=%r",
-            update.effective_chat.id if update.effective_chat else None,
-            update.effective_user.id if update.effective_user else None,
-            update.effective_message.text if update.effective_message else None,
+            chat.id if chat else None,
+            user.id if user else None,
+            effective_message.text if effective_message else None,
         )
+    if debug:
         logger.debug(
             "word_message ENTER chat_id=%s type=%s thread=%s user=%s text=%r",
-            update.effective_chat.id if update.effective_chat else None,
-            update.effective_chat.type if update.effective_chat else None,
-            update.effective_message.message_thread_id if update.effective_message else None,
-            update.effective_user.id if update.effective_user else None,
-            update.effective_message.text if update.effective_message else None,
+            chat.id if chat else None,
+            chat.type if chat else None,
+            effective_message.message_thread_id if effective_message else None,
+            user.id if user else None,
+            effective_message.text if effective_message else None,
         )
-    except Exception:
-        pass
-    chat = update.effective_chat
     chat_id = chat.id
-    thread_id = update.effective_message.message_thread_id
-    user_id = update.effective_user.id
+    thread_id = effective_message.message_thread_id
+    user_id = user.id
     tokens = update.message.text.split()
     words_tokens = tokens
     game = get_game(chat_id, thread_id)
-    logger.debug(
-        "word_message after get_game: game=%s status=%s (chat=%s,thread=%s)",
-        (game.game_id if game else None),
-        (game.status if game else None),
-        chat_id, thread_id
-    )
+    if debug:
+        logger.debug(
+            "word_message after get_game: game=%s status=%s (chat=%s,thread=%s)",
+            (game.game_id if game else None),
+            (game.status if game else None),
+            chat_id, thread_id
+        )
     if not game and chat.type == "private":
         if tokens:
             gid = tokens[0]
@@ -1440,27 +1678,26 @@ async def word_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             if potential and user_id in potential.players:
                 game = potential
                 words_tokens = tokens[1:]
-        if not game:
-            for g in ACTIVE_GAMES.values():
-                if g.player_chats.get(user_id) == chat_id:
-                    game = g
-                    break
+        # A private chat id is the user id, and every player's own chat is
+        # registered in CHAT_GAMES, so get_game above already covered the
+        # user's game; no scan over ACTIVE_GAMES is needed.
     if not game or game.status != "running":
         target = game
-        if target and user_id in target.players and not target.players[user_id].name:
+        target_player = target.players.get(user_id) if target else None
+        if target_player and not target_player.name:
             await request_name(user_id, chat_id, context)
         elif not target:
-            for g in ACTIVE_GAMES.values():
-                p = g.players.get(user_id)
-                if p and not p.name:
-                    await request_name(user_id, chat_id, context)
-                    break
-        logger.debug(
-            "word_message EXIT: no game or not running; game=%s status=%s chat=%s thread=%s",
-            (game.game_id if game else None),
-            (game.status if game else None),
-            chat_id, thread_id
-        )
+            own_game = get_game(user_id, None)
+            p = own_game.players.get(user_id) if own_game else None
+            if p and not p.name:
+                await request_name(user_id, chat_id, context)
+        if debug:
+            logger.debug(
+                "word_message EXIT: no game or not running; game=%s status=%s chat=%s thread=%s",
+                (game.game_id if game else None),
+                (game.status if game else None),
+                chat_id, thread_id
+            )
         return
     game.player_chats[user_id] = chat.id
     CHAT_GAMES[(chat.id, 0)] = game.game_id
@@ -1482,28 +1719,27 @@ async def word_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     if not player.name:
         await request_name(user_id, chat_id, context)
         return
-    words = [normalize_word(w) for w in words_tokens]
     player_name = player.name
-    tasks: List = []
-
-    async def send_to_user(text: str) -> None:
-        logger.debug("send_to_user start %.6f", perf_counter() - start_ts)
-        emoji = "✅" if text.startswith("Зачтено") else "❌"
+    # Verdicts for every word in the message go out as one reply, and long-word
+    # announcements as one broadcast, instead of one API call per word.
+    replies: List[str] = []
+    announcements: List[str] = []
+    accepted = False
+
+    async def send_to_user(text: str, accepted: bool) -> None:
+        if debug:
+            logger.debug("send_to_user start %.6f", perf_counter() - start_ts)
+        emoji = "✅" if accepted else "❌"
         try:
             await context.bot.send_message(user_id, emoji)
             await context.bot.send_message(user_id, text)
         except TelegramError:
+            # In the game chat the verdict and its emoji share one message.
             await send_game_message(
                 chat_id,
                 thread_id,
                 context,
-                f"{player_name} {emoji}",
-            )
-            await send_game_message(
-                chat_id,
-                thread_id,
-                context,
-                f"{player_name} {text}",
+                f"{player_name} {emoji}\n{text}",
             )
             if not context.user_data.get("dm_warned"):
                 context.user_data["dm_warned"] = True
@@ -1513,52 +1749,38 @@ async def word_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                     context,
                     f"{player_name} напишите мне в личные сообщения (/start), чтобы получать мгновенную обратную связь.",
                 )
-        logger.debug("send_to_user end %.6f", perf_counter() - start_ts)
-
-    for w in words:
-        if not is_cyrillic(w) or len(w) < 3:
-            tasks.append(send_to_user(f"Отклонено: {w} (принимаются слова из 3 букв и длиннее)"))
-            continue
-        if w in player.words:
-            tasks.append(send_to_user(f"Отклонено: {w} (вы уже использовали это слово)"))
-            continue
-        if w in game.used_words:
-            tasks.append(send_to_user(f"Отклонено: {w} (уже использовано другим игроком)"))
-            continue
-        if w not in DICT:
-            tasks.append(send_to_user(f"Отклонено: {w} (такого слова нет в словаре)"))
-            continue
-        if not can_make(w, game.letters):
-            tasks.append(send_to_user(f"Отклонено: {w} (нет таких букв)"))
-            continue
-        game.used_words.add(w)
-        player.words.append(w)
-        game.word_history.append((player.user_id, w))
-        pts = 2 if len(w) >= 6 else 1
-        player.points += pts
-        message = f"Зачтено: {w}"
-        if len(w) >= 6:
-            message += "\nБраво! Вы получили 2 очка за это слово. 🤩"
-        tasks.append(send_to_user(message))
-        if len(w) >= 6:
-            name = player_name
-            length = len(w)
-            phrases = [
-                f"🔥 {name} жжёт! Прилетело слово из {length} букв.",
-                f"{name} выдает красоту ✨: слово из {length} букв!",
-                f"🥊 {name} в ударе! Словечко на {length} букв.",
-                f"💣 Да это ж бомба! Слово из {length} букв от игрока {name}.",
-                f"😎 Лови стиль: {name} выкатывает слово на {length} букв.",
-                f"Ход короля! 👑 {name} выкладывает слово из {length} букв.",
-            ]
-            tasks.append(broadcast(game.game_id, random.choice(phrases)))
-
-    if tasks:
-        logger.debug("before asyncio.gather %.6f", perf_counter() - start_ts)
-        await asyncio.gather(*tasks)
-        logger.debug("after asyncio.gather %.6f", perf_counter() - start_ts)
+        if debug:
+            logger.debug("send_to_user end %.6f", perf_counter() - start_ts)
+
+    for token in words_tokens:
+        reply, announcement = judge_word(game, player, normalize_word(token))
+        replies.append(reply)
+        if announcement is not None:
+            accepted = True
+            if announcement:
+                announcements.append(announcement)
+
+    reply_text = "\n".join(replies)
+    if announcements:
+        if debug:
+            logger.debug("before asyncio.gather %.6f", perf_counter() - start_ts)
+        # One failed send must not hide the other's outcome; log and move on.
+        results = await asyncio.gather(
+            send_to_user(reply_text, accepted),
+            broadcast(game.game_id, "\n".join(announcements)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("word_message delivery failed: %s", result)
+        if debug:
+            logger.debug("after asyncio.gather %.6f", perf_counter() - start_ts)
+    elif replies:
+        # Usual case: no announcement, so skip wrapping the reply in a task.
+        await send_to_user(reply_text, accepted)
     schedule_refresh_base_button(chat_id, thread_id, context)
-    logger.debug("word_message end %.6f", perf_counter() - start_ts)
+    if debug:
+        logger.debug("word_message end %.6f", perf_counter() - start_ts)
 
 async def manual_base_word(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     chat_id = update.effective_chat.id
@@ -1591,7 +1813,9 @@ async def bot_move(context: CallbackContext) -> None:
     game = get_game(chat_id, thread_id or 0)
     if not game or game.status != "running":
         return
-    available = [w for w in DICT if len(w) >= 3 and can_make(w, game.letters) and w not in game.used_words]
+    if not game.valid_words:
+        game.valid_words = playable_words(game.letters)
+    available = [w for w in game.valid_words if w not in game.used_words]
     if not available:
         return
     word = random.choice(available)
@@ -1599,7 +1823,7 @@ async def bot_move(context: CallbackContext) -> None:
     if bot_player:
         bot_player.words.append(word)
         game.word_history.append((bot_player.user_id, word))
-        pts = 2 if len(word) >= 6 else 1
+        pts = 2 if len(word) >= LONG_WORD_LEN else 1
         bot_player.points += pts
         game.used_words.add(word)
         await broadcast(game.game_id, f"🤖 {bot_player.name}: {word}")
@@ -1625,44 +1849,12 @@ async def handle_submission(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not player.name:
         await request_name(user.id, chat_id, context)
         return
-    words = [normalize_word(w) for w in message.text.split()]
     handled = False
-    for w in words:
-        if not is_cyrillic(w) or len(w) < 3:
-            await message.reply_text(
-                f"Отклонено: {w} (принимаются слова из 3 букв и длиннее)"
-            )
-            continue
-        if w in player.words:
-            await message.reply_text(
-                f"Отклонено: {w} (вы уже использовали это слово)"
-            )
-            continue
-        if w in game.used_words:
-            await message.reply_text(
-                f"Отклонено: {w} (уже использовано другим игроком)"
-            )
-            continue
-        if w not in DICT:
-            await message.reply_text(
-                f"Отклонено: {w} (такого слова нет в словаре)"
-            )
-            continue
-        if not can_make(w, game.letters):
-            await message.reply_text(
-                f"Отклонено: {w} (нет таких букв)"
-            )
-            continue
-        game.used_words.add(w)
-        player.words.append(w)
-        game.word_history.append((player.user_id, w))
-        pts = 2 if len(w) >= 6 else 1
-        player.points += pts
-        msg = f"Зачтено: {w}"
-        if len(w) >= 6:
-            msg += "\nБраво! Вы получили 2 очка за это слово. 🤩"
-        await message.reply_text(msg)
-        handled = True
+    for token in message.text.split():
+        reply, announcement = judge_word(game, player, normalize_word(token))
+        await message.reply_text(reply)
+        if announcement is not None:
+            handled = True
     schedule_refresh_base_button(chat_id, thread_id, context)
     if handled:
         raise ApplicationHandlerStop
@@ -1770,7 +1962,13 @@ def register_handlers(application: Application, include_start: bool = False) ->
 @app.on_event("startup")
 async def on_startup() -> None:
     global APPLICATION, BOT_USERNAME
-    APPLICATION = Application.builder().token(TOKEN).build()
+    APPLICATION = (
+        Application.builder()
+        .token(TOKEN)
+        # Keeps fan-out under Telegram's flood limits and retries on RetryAfter.
+        .rate_limiter(AIORateLimiter(max_retries=3))
+        .build()
+    )
     BOT_USERNAME = (await APPLICATION.bot.get_me()).username
     register_handlers(APPLICATION, include_start=True)
 
@@ -1798,15 +1996,19 @@ async def on_shutdown() -> None:
     await APPLICATION.shutdown()
 
 
+# The webhook acknowledgement never changes, so it is rendered once.
+WEBHOOK_OK_BODY = b'{"ok":true}'
+
+
 @app.post(WEBHOOK_PATH)
-async def telegram_webhook(request: Request) -> JSONResponse:
+async def telegram_webhook(request: Request) -> Response:
     if request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
         raise HTTPException(status_code=403, detail="Invalid secret")
-    data = await request.json()
+    data = _json_loads(await request.body())
     logger.debug("Webhook update keys: %s", list(data.keys()))
     update = Update.de_json(data, APPLICATION.bot)
     await APPLICATION.process_update(update)
-    return JSONResponse({"ok": True})
+    return Response(content=WEBHOOK_OK_BODY, media_type="application/json")
 
 
 @app.get("/set_webhook")
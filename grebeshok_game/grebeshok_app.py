@@ -31,6 +31,7 @@ import os
 import random
 import re
 from dataclasses import dataclass, field
+from time import monotonic
 from typing import Dict, List, Optional, Set, Tuple
 
 from fastapi import FastAPI, HTTPException, Request
@@ -47,6 +48,7 @@ from telegram import (
 )
 from telegram.error import BadRequest, Forbidden, TelegramError
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     ApplicationHandlerStop,
     CallbackContext,
@@ -325,7 +327,7 @@ async def refresh_base_letters_button(
             message_thread_id=thread_id or None,
         )
         BASE_MSG_IDS[key] = msg.message_id
-        LAST_REFRESH[key] = asyncio.get_event_loop().time()
+        LAST_REFRESH[key] = monotonic()
 
 
 def schedule_refresh_base_letters(
@@ -333,7 +335,7 @@ def schedule_refresh_base_letters(
 ) -> None:
     """Throttle refresh of the base letters button."""
 
-    now = asyncio.get_event_loop().time()
+    now = monotonic()
     key = (chat_id, thread_id)
     last = LAST_REFRESH.get(key, 0)
     if now - last < 1:
@@ -1723,7 +1725,13 @@ app = FastAPI()
 @app.on_event("startup")
 async def on_startup() -> None:
     global APPLICATION, BOT_USERNAME
-    APPLICATION = Application.builder().token(TOKEN).build()
+    APPLICATION = (
+        Application.builder()
+        .token(TOKEN)
+        # Keeps fan-out under Telegram's flood limits and retries on RetryAfter.
+        .rate_limiter(AIORateLimiter(max_retries=3))
+        .build()
+    )
     BOT_USERNAME = (await APPLICATION.bot.get_me()).username
     register_handlers(APPLICATION, include_start=True)
     await APPLICATION.initialize()
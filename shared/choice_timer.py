@@ -91,26 +91,33 @@ class ChoiceTimerHandle:
             logger.exception("Error in timeout callback")
 
     async def _edit_timer_messages(self, text: str) -> None:
-        for chat_id, thread_id, message_id in list(self.timer_messages):
+        bot = self.context.bot
+
+        async def edit(chat_id: int, thread_id: Optional[int], message_id: int) -> None:
             try:
                 kwargs = {"chat_id": chat_id, "message_id": message_id}
                 if thread_id is not None:
                     kwargs["message_thread_id"] = thread_id
-                await self.context.bot.edit_message_text(text=text, **kwargs)
+                await bot.edit_message_text(text=text, **kwargs)
             except TelegramError:
-                continue
+                pass
+
+        # One tick edits every chat's timer together instead of one after another.
+        await asyncio.gather(*(edit(*entry) for entry in list(self.timer_messages)))
 
     async def _disable_choice_markup(self) -> None:
-        for chat_id, thread_id, message_id in list(self.messages):
+        bot = self.context.bot
+
+        async def disable(chat_id: int, thread_id: Optional[int], message_id: int) -> None:
             try:
                 kwargs = {"chat_id": chat_id, "message_id": message_id}
                 if thread_id is not None:
                     kwargs["message_thread_id"] = thread_id
-                await self.context.bot.edit_message_reply_markup(
-                    reply_markup=None, **kwargs
-                )
+                await bot.edit_message_reply_markup(reply_markup=None, **kwargs)
             except TelegramError:
-                continue
+                pass
+
+        await asyncio.gather(*(disable(*entry) for entry in list(self.messages)))
 
     async def complete(self, final_timer_text: Optional[str] = _UNSET) -> None:
         """Stop the timer and disable choice buttons."""
@@ -163,7 +170,10 @@ async def send_choice_with_timer(
 
     first_timer_text = (tuple(timer_sequence) or DEFAULT_TIMER_SEQUENCE)[0]
 
-    for chat_id, thread_id in targets:
+    async def send_to(
+        chat_id: int, thread_id: Optional[int]
+    ) -> Tuple[Optional[int], Optional[int]]:
+        # The choice and its timer stay ordered within a chat; chats run concurrently.
         try:
             msg = await send_func(
                 chat_id,
@@ -175,8 +185,7 @@ async def send_choice_with_timer(
             )
         except TelegramError:
             logger.exception("Failed to send choice message to %s", chat_id)
-            continue
-        messages.append((chat_id, thread_id, msg.message_id))
+            return None, None
         try:
             timer_msg = await send_func(
                 chat_id,
@@ -187,8 +196,17 @@ async def send_choice_with_timer(
             )
         except TelegramError:
             logger.exception("Failed to send timer message to %s", chat_id)
-            continue
-        timer_messages.append((chat_id, thread_id, timer_msg.message_id))
+            return msg.message_id, None
+        return msg.message_id, timer_msg.message_id
+
+    results = await asyncio.gather(
+        *(send_to(chat_id, thread_id) for chat_id, thread_id in targets)
+    )
+    for (chat_id, thread_id), (message_id, timer_id) in zip(targets, results):
+        if message_id is not None:
+            messages.append((chat_id, thread_id, message_id))
+        if timer_id is not None:
+            timer_messages.append((chat_id, thread_id, timer_id))
 
     handle = ChoiceTimerHandle(
         context=context,
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import json
 import sys
 from pathlib import Path
 from types import SimpleNamespace
@@ -13,10 +14,11 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from balda_game.handlers import gameplay
 from balda_game.handlers import lobby
+from balda_game.handlers import router
 from balda_game.services import GameStats
 from balda_game.state import GameState, PlayerState, TurnRecord
 from balda_game.state.manager import GameStateManager, STATE_MANAGER
-from balda_game.state.storage import StateStorage
+from balda_game.state.storage import StateStorage, pack_chat_key
 
 
 class _DummyJob:
@@ -73,6 +75,15 @@ def _prepare_state(*, sequence: str = "к") -> GameState:
     return state
 
 
+@pytest.mark.parametrize(
+    "text",
+    ["рака", "к", "ёж", "Кот", "cat", "кот1", "кот²", "½", "Ⅻ", "一", "ʰ", "-_ ", ""],
+)
+def test_is_cyrillic_matches_per_letter_check(text: str) -> None:
+    expected = all("а" <= ch <= "я" for ch in text if ch.isalpha())
+    assert gameplay._is_cyrillic(text) is expected
+
+
 def test_game_state_add_turn_and_reset_timer() -> None:
     state = GameState(game_id="g", host_id=1, chat_id=10, sequence="ра")
     reminder_job = _DummyJob()
@@ -88,6 +99,11 @@ def test_game_state_add_turn_and_reset_timer() -> None:
     assert state.sequence == "бран"
     assert state.direction == "right"
     assert state.words_used[-1] is right_turn
+    assert state.total_turns == 2
+    assert state.unique_words == {"бра", "бран"}
+    assert list(state.turn_players) == [1, 2]
+    assert state.turn_words == ["бра", "бран"]
+    assert state.turn_directions == b"LR"
 
     state.reset_timer()
     assert state.timer_job == {}
@@ -229,6 +245,180 @@ def test_state_manager_persists_games_between_instances(tmp_path: Path) -> None:
     assert restored_manager.get_by_join_code(join_code) is restored
 
 
+def test_state_storage_migrates_legacy_turns(tmp_path: Path) -> None:
+    legacy_path = tmp_path / ".balda_state.json"
+    legacy_path.write_text(
+        json.dumps(
+            {
+                "games": {
+                    "g1": {
+                        "game_id": "g1",
+                        "host_id": 1,
+                        "chat_id": 10,
+                        "sequence": "рака",
+                        "players": {"1": {"user_id": 1, "name": "Alice", "is_host": True}},
+                        "players_active": [1],
+                        "words_used": [
+                            {
+                                "player_id": 1,
+                                "letter": "к",
+                                "word": "рака",
+                                "direction": "right",
+                                "timestamp": "2024-01-01T12:00:00",
+                            }
+                        ],
+                    }
+                },
+                "chat_index": [{"chat_id": 10, "thread_id": 0, "game_id": "g1"}],
+                "join_codes": {},
+            }
+        ),
+        encoding="utf-8",
+    )
+    storage_path = tmp_path / "state"
+
+    manager = GameStateManager(storage=StateStorage(storage_path, legacy_path=legacy_path))
+    migrated = manager.get_by_chat(10, None)
+    assert migrated is not None
+    assert [turn.word for turn in migrated.words_used] == ["рака"]
+
+    restored = GameStateManager(storage=StateStorage(storage_path, legacy_path=legacy_path))
+    game = restored.get_by_id("g1")
+    assert game is not None
+    assert [turn.word for turn in game.words_used] == ["рака"]
+
+
+def test_state_manager_replays_operation_log_over_snapshot(tmp_path: Path) -> None:
+    storage = StateStorage(tmp_path / "state")
+    manager = GameStateManager(storage=storage)
+    dropped = manager.create_lobby(host_id=1, chat_id=10)
+    manager.ensure_join_code(dropped)
+    manager.compact()
+
+    kept = manager.create_lobby(host_id=2, chat_id=20, thread_id=3)
+    code = manager.ensure_join_code(kept)
+    manager.drop_game(dropped.game_id)
+
+    assert (tmp_path / "state" / "ops.log").exists()
+    restored = GameStateManager(storage=storage)
+    assert not (tmp_path / "state" / "ops.log").exists()
+    assert sorted(path.stem for path in (tmp_path / "state" / "games").iterdir()) == [kept.game_id]
+    assert restored.get_by_id(dropped.game_id) is None
+    assert restored.get_by_chat(10, None) is None
+    assert restored.get_by_chat(20, 3).game_id == kept.game_id
+    assert restored.get_by_join_code(code).game_id == kept.game_id
+
+
+def test_state_manager_appends_only_new_turns(tmp_path: Path) -> None:
+    storage_path = tmp_path / "state"
+    manager = GameStateManager(storage=StateStorage(storage_path))
+    state = manager.create_lobby(host_id=1, chat_id=10)
+    state.set_initial_letter("а")
+    state.add_turn(TurnRecord(player_id=1, letter="р", word="ар", direction="right"))
+    manager.save(state)
+    state.add_turn(TurnRecord(player_id=1, letter="б", word="бар", direction="left"))
+    manager.save(state)
+
+    turns_path = storage_path / "games" / f"{state.game_id}.turns.jsonl"
+    assert len(turns_path.read_bytes().splitlines()) == 2
+    # A turn that reached the file without its game record is discarded on load.
+    with turns_path.open("ab") as handle:
+        handle.write(b'[1,"\xd0\xb0","\xd0\xb1\xd0\xb0\xd1\x80\xd0\xb0",')
+
+    restored = GameStateManager(storage=StateStorage(storage_path)).get_by_id(state.game_id)
+    assert restored is not None
+    assert [turn.word for turn in restored.words_used] == ["ар", "бар"]
+    assert [turn.direction for turn in restored.words_used] == ["right", "left"]
+    assert restored.words_used[0].timestamp == state.words_used[0].timestamp
+    assert len(turns_path.read_bytes().splitlines()) == 2
+
+
+def test_state_manager_decodes_restored_games_on_first_access(tmp_path: Path) -> None:
+    storage_path = tmp_path / "state"
+    manager = GameStateManager(storage=StateStorage(storage_path))
+    state = manager.create_lobby(host_id=1, chat_id=10)
+    state.players = {
+        1: PlayerState(user_id=1, name="Alice", is_host=True),
+        2: PlayerState(user_id=2, name="Bob"),
+    }
+    manager.save(state)
+    manager.compact()
+
+    restored = GameStateManager(storage=StateStorage(storage_path))
+    assert len(restored._active_games) == 0
+    found = restored.find_by_player(2)
+    assert found is not None and found.game_id == state.game_id
+    assert restored.get_by_chat(10, None) is found
+    assert len(restored._active_games) == 1
+
+
+def test_state_manager_find_by_player_stable_across_restart(tmp_path: Path) -> None:
+    storage_path = tmp_path / "state"
+    manager = GameStateManager(storage=StateStorage(storage_path))
+    older = manager.create_lobby(host_id=1, chat_id=10)
+    older.players = {1: PlayerState(user_id=1, name="Alice"), 5: PlayerState(user_id=5, name="Eve")}
+    manager.save(older)
+    newer = manager.create_lobby(host_id=2, chat_id=20)
+    newer.players = {2: PlayerState(user_id=2, name="Bob"), 5: PlayerState(user_id=5, name="Eve")}
+    manager.save(newer)
+    assert manager.find_by_player(5) is newer
+    manager.flush_now()
+
+    restored = GameStateManager(storage=StateStorage(storage_path))
+    # Decoding the older game first must not steal the player back.
+    assert restored.get_by_id(older.game_id) is not None
+    found = restored.find_by_player(5)
+    assert found is not None and found.game_id == newer.game_id
+
+
+def test_state_manager_skips_unchanged_saves(tmp_path: Path) -> None:
+    storage_path = tmp_path / "state"
+    manager = GameStateManager(storage=StateStorage(storage_path))
+    state = manager.create_lobby(host_id=1, chat_id=10)
+    log_path = storage_path / "ops.log"
+    written = log_path.read_bytes()
+
+    manager.save(state)
+    assert log_path.read_bytes() == written
+
+    state.sequence = "к"
+    manager.save(state)
+    assert len(log_path.read_bytes().splitlines()) == 2
+
+
+def test_state_storage_reuses_encoding_until_invalidated(tmp_path: Path) -> None:
+    storage = StateStorage(tmp_path / "state")
+    state = GameState(game_id="g1", host_id=1, chat_id=1)
+    first = storage.encode_game(state)
+    state.sequence = "А"
+
+    assert storage.encode_game(state) is first
+    storage.invalidate("g1")
+    assert json.loads(storage.encode_game(state))["sequence"] == "А"
+    record = json.loads(storage.encode_put(state, pack_chat_key(1, 0), "code"))
+    assert record["p"]["game"]["sequence"] == "А"
+    assert record["p"]["chat_key"] == [1, 0]
+    assert record["p"]["join_code"] == "code"
+
+
+@pytest.mark.anyio
+async def test_state_manager_coalesces_writes_inside_event_loop(tmp_path: Path) -> None:
+    storage_path = tmp_path / "state.json"
+    manager = GameStateManager(storage=StateStorage(storage_path))
+
+    state = manager.create_lobby(host_id=1, chat_id=10)
+    state.sequence = "к"
+    manager.save(state)
+    manager.save(state)
+
+    assert not storage_path.exists()
+    await manager.flush()
+
+    restored = GameStateManager(storage=StateStorage(storage_path)).get_by_id(state.game_id)
+    assert restored is not None
+    assert restored.sequence == "к"
+
+
 def test_state_manager_finds_game_by_player() -> None:
     state = STATE_MANAGER.create_lobby(host_id=1, chat_id=10)
     player = PlayerState(user_id=1, name="Alice", is_host=True)
@@ -242,6 +432,35 @@ def test_state_manager_finds_game_by_player() -> None:
     assert STATE_MANAGER.find_by_player(9999) is None
 
 
+def test_state_manager_evicts_oldest_game_when_full(tmp_path: Path) -> None:
+    manager = GameStateManager(storage=StateStorage(tmp_path / "state.json"), max_games=1)
+
+    first = manager.create_lobby(host_id=1, chat_id=10)
+    code = manager.ensure_join_code(first)
+    second = manager.create_lobby(host_id=2, chat_id=20)
+
+    assert manager.get_by_id(first.game_id) is None
+    assert manager.get_by_chat(10, None) is None
+    assert manager.has_join_code(code) is False
+    assert manager.get_by_chat(20, None) is second
+
+
+def test_state_manager_persists_ttl_eviction(tmp_path: Path) -> None:
+    storage_path = tmp_path / "state"
+    manager = GameStateManager(storage=StateStorage(storage_path), game_ttl=60)
+    now = [0.0]
+    manager._active_games._timer = lambda: now[0]
+    state = manager.create_lobby(host_id=1, chat_id=10)
+
+    # The game expires and nothing else is saved afterwards.
+    now[0] = 61.0
+    assert manager.get_by_id(state.game_id) is None
+
+    restored = GameStateManager(storage=StateStorage(storage_path))
+    assert restored.get_by_id(state.game_id) is None
+    assert restored.get_by_chat(10, None) is None
+
+
 @pytest.mark.anyio
 async def test_quit_cmd_removes_player_from_lobby(monkeypatch: pytest.MonkeyPatch) -> None:
     state = STATE_MANAGER.create_lobby(host_id=1, chat_id=50)
@@ -322,3 +541,18 @@ async def test_quit_cmd_eliminates_active_player(monkeypatch: pytest.MonkeyPatch
     assert message.reply_text.await_args_list[-1].args[0].startswith("Вы покинули игру")
     sent_texts = [call.args[1] for call in bot.send_message.await_args_list]
     assert any("покинул" in text for text in sent_texts)
+
+
+@pytest.mark.anyio
+async def test_root_callback_dispatches_by_prefix(monkeypatch: pytest.MonkeyPatch) -> None:
+    turn_handler = AsyncMock()
+    pass_handler = AsyncMock()
+    monkeypatch.setitem(router._CALLBACK_DISPATCH, "turn", turn_handler)
+    monkeypatch.setitem(router._CALLBACK_DISPATCH, "pass", pass_handler)
+    update = SimpleNamespace(callback_query=SimpleNamespace(data="balda:turn:left:abc"))
+    context = SimpleNamespace()
+
+    await router.root_callback(update, context)
+
+    turn_handler.assert_awaited_once_with(update, context)
+    pass_handler.assert_not_awaited()
@@ -654,6 +654,7 @@ def test_base_random_handles_insufficient_candidates():
             app.LAST_REFRESH.clear()
             app.CHAT_GAMES.clear()
             app.DICT.clear()
+            app.rebuild_base_candidates()
 
             host_id = 303
             chat_id = 303
@@ -681,6 +682,7 @@ def test_base_random_handles_insufficient_candidates():
         finally:
             app.DICT.clear()
             app.DICT.update(old_dict)
+            app.rebuild_base_candidates()
             app.ACTIVE_GAMES.clear()
             app.ACTIVE_GAMES.update(old_active_games)
             app.JOIN_CODES.clear()
@@ -695,6 +697,185 @@ def test_base_random_handles_insufficient_candidates():
     asyncio.run(run())
 
 
+def test_base_candidates_rebuilt_from_dictionary():
+    old_dict = set(app.DICT)
+    try:
+        app.DICT.clear()
+        app.DICT.update({"абрикосы", "апельсины", "мандаринка", "кот"})
+        app.rebuild_base_candidates()
+        assert sorted(app.base_candidates(3, 1)) == ["абрикосы", "апельсины", "мандаринка"]
+        assert sorted(app.base_candidates(3, 3)) == ["апельсины", "мандаринка"]
+        assert app.base_candidates(5, 3) == ("мандаринка",)
+    finally:
+        app.DICT.clear()
+        app.DICT.update(old_dict)
+        app.rebuild_base_candidates()
+
+
+def test_playable_words_respect_letter_counts():
+    old_dict = set(app.DICT)
+    try:
+        app.DICT.clear()
+        app.DICT.update({"кот", "ток", "коттедж", "от", "тот"})
+        letters = app.Counter("котик")
+        assert app.playable_words(letters) == {"кот", "ток"}
+    finally:
+        app.DICT.clear()
+        app.DICT.update(old_dict)
+
+
+def test_bold_alnum_keeps_entities_intact():
+    assert app.bold_alnum("Аня & <Bo_b>") == (
+        "<b>А</b><b>н</b><b>я</b> &amp; &lt;<b>B</b><b>o</b>_<b>b</b>&gt;"
+    )
+
+
+def test_join_code_reused_until_dropped():
+    old_join_codes = app.JOIN_CODES.copy()
+    old_game_codes = app.GAME_TO_CODE.copy()
+    try:
+        code = app.join_code_for("gid")
+        assert app.join_code_for("gid") == code
+        assert app.JOIN_CODES[code] == "gid"
+        app.drop_join_code("gid")
+        assert code not in app.JOIN_CODES
+        assert "gid" not in app.GAME_TO_CODE
+    finally:
+        app.JOIN_CODES.clear()
+        app.JOIN_CODES.update(old_join_codes)
+        app.GAME_TO_CODE.clear()
+        app.GAME_TO_CODE.update(old_game_codes)
+
+
+def test_users_shared_invites_sorted_by_outcome():
+    old_active = app.ACTIVE_GAMES.copy()
+    old_chat_games = app.CHAT_GAMES.copy()
+    old_join_codes = app.JOIN_CODES.copy()
+    old_game_codes = app.GAME_TO_CODE.copy()
+    try:
+        game = app.GameState(host_id=1, game_id="gid")
+        app.ACTIVE_GAMES["gid"] = game
+        app.CHAT_GAMES[(1, 0)] = "gid"
+
+        async def send_message(user_id, text):
+            if user_id == 3:
+                raise app.Forbidden("bot can't initiate conversation with a user")
+            return SimpleNamespace(message_id=1)
+
+        message = DummyMessage(1, 1)
+        message.users_shared = SimpleNamespace(
+            users=[
+                SimpleNamespace(user_id=2, first_name="Боб"),
+                SimpleNamespace(user_id=3, first_name="Ева"),
+            ]
+        )
+        update = SimpleNamespace(
+            message=message, effective_chat=message.chat, effective_message=message
+        )
+        context = SimpleNamespace(bot=SimpleNamespace(send_message=send_message))
+        with patch.object(app, "send_game_message", new=AsyncMock()) as sent:
+            asyncio.run(app.users_shared_handler(update, context))
+
+        assert game.invited_users == {2}
+        summary = sent.await_args.args[3]
+        assert "✅ Приглашения доставлены: Боб" in summary
+        assert "❌ Не удалось отправить: Ева" in summary
+    finally:
+        for current, old in (
+            (app.ACTIVE_GAMES, old_active),
+            (app.CHAT_GAMES, old_chat_games),
+            (app.JOIN_CODES, old_join_codes),
+            (app.GAME_TO_CODE, old_game_codes),
+        ):
+            current.clear()
+            current.update(old)
+
+
+def test_quit_keeps_chats_rebound_to_another_game():
+    old_active = app.ACTIVE_GAMES.copy()
+    old_chat_games = app.CHAT_GAMES.copy()
+    try:
+        old_game = app.GameState(host_id=1, game_id="old")
+        old_game.player_chats = {1: 1, 2: 2}
+        new_game = app.GameState(host_id=2, game_id="new")
+        new_game.player_chats = {2: 2}
+        app.ACTIVE_GAMES.update({"old": old_game, "new": new_game})
+        # Player 2 has already moved on to the new game from the same chat.
+        app.CHAT_GAMES[(1, 0)] = "old"
+        app.CHAT_GAMES[(2, 0)] = "new"
+
+        message = DummyMessage(1, 1, "/quit")
+        update = SimpleNamespace(
+            effective_chat=message.chat,
+            effective_user=message.from_user,
+            message=message,
+        )
+        context = SimpleNamespace(user_data={}, application=None)
+        with patch.object(app, "broadcast", new=AsyncMock()):
+            asyncio.run(app.quit_cmd(update, context))
+
+        assert "old" not in app.ACTIVE_GAMES
+        assert app.get_game(1, None) is None
+        assert app.get_game(2, None) is new_game
+    finally:
+        app.ACTIVE_GAMES.clear()
+        app.ACTIVE_GAMES.update(old_active)
+        app.CHAT_GAMES.clear()
+        app.CHAT_GAMES.update(old_chat_games)
+
+
+def test_admin_test_game_keeps_its_chat_mapping():
+    old_active = app.ACTIVE_GAMES.copy()
+    old_chat_games = app.CHAT_GAMES.copy()
+    try:
+        stale = app.GameState(host_id=7, game_id="stale")
+        stale.player_chats = {7: 7, 8: 8}
+        app.ACTIVE_GAMES["stale"] = stale
+        app.CHAT_GAMES[(7, 0)] = "stale"
+        app.CHAT_GAMES[(8, 0)] = "stale"
+
+        message = DummyMessage(7, 7)
+        query = DummyCallbackQuery("adm_test", message, 7)
+        update = SimpleNamespace(callback_query=query)
+        context = SimpleNamespace(user_data={"name": "Админ"})
+        with (
+            patch.object(app, "ADMIN_ID", 7),
+            patch.object(app, "hide_invite_keyboard", new=AsyncMock()),
+            patch.object(app, "maybe_show_base_options", new=AsyncMock()),
+        ):
+            asyncio.run(app.time_selected(update, context))
+
+        assert "stale" not in app.ACTIVE_GAMES
+        assert (8, 0) not in app.CHAT_GAMES
+        game = app.get_game(7, None)
+        assert game is not None and game.game_id != "stale"
+    finally:
+        app.ACTIVE_GAMES.clear()
+        app.ACTIVE_GAMES.update(old_active)
+        app.CHAT_GAMES.clear()
+        app.CHAT_GAMES.update(old_chat_games)
+
+
+def test_last_refresh_prunes_stale_entries():
+    old_last_refresh = app.LAST_REFRESH.copy()
+    try:
+        app.LAST_REFRESH.clear()
+        app.LAST_REFRESH.update({(i, 0): 0.0 for i in range(app.LAST_REFRESH_MAX)})
+        async def run():
+            with patch.object(app, "monotonic", return_value=10_000.0), patch.object(
+                app, "refresh_base_button", new=AsyncMock()
+            ):
+                app.schedule_refresh_base_button(-1, 0, None)
+                await asyncio.sleep(0)
+
+        asyncio.run(run())
+        assert app.LAST_REFRESH == {(-1, 0): 10_000.0}
+        assert (-1, 0) not in app.REFRESH_TASKS
+    finally:
+        app.LAST_REFRESH.clear()
+        app.LAST_REFRESH.update(old_last_refresh)
+
+
 def test_grebeshok_invite_flow_from_newgame():
     async def run():
         old_active = greb_app.ACTIVE_GAMES.copy()
@@ -1035,6 +1216,93 @@ def test_choose_grebeshok_then_set_name_replies_with_confirmation():
     asyncio.run(run())
 
 
+def test_word_message_batches_verdicts_into_one_reply():
+    async def run():
+        old_active = app.ACTIVE_GAMES.copy()
+        old_chat_games = app.CHAT_GAMES.copy()
+        try:
+            app.ACTIVE_GAMES.clear()
+            app.CHAT_GAMES.clear()
+
+            game = app.GameState(host_id=1, game_id="gid", status="running")
+            game.players[1] = app.Player(user_id=1, name="Алиса")
+            game.player_chats[1] = 1
+            game.base_word = "котлета"
+            game.letters = app.Counter(game.base_word)
+            game.valid_words = {"кот", "котлет"}
+            app.ACTIVE_GAMES["gid"] = game
+            app.CHAT_GAMES[(1, 0)] = "gid"
+
+            message = DummyMessage(1, 1, "кот котлет zz")
+            update = SimpleNamespace(
+                effective_chat=message.chat,
+                effective_message=message,
+                effective_user=message.from_user,
+                message=message,
+            )
+            bot = SimpleNamespace(send_message=AsyncMock())
+            context = SimpleNamespace(bot=bot, user_data={})
+
+            with (
+                patch.object(app, "broadcast", new=AsyncMock()) as broadcast_mock,
+                patch.object(app, "schedule_refresh_base_button", lambda *a, **kw: None),
+            ):
+                await app.word_message(update, context)
+
+            sent = [call.args[1] for call in bot.send_message.await_args_list]
+            assert sent[0] == "✅"
+            assert sent[1].splitlines() == [
+                "Зачтено: кот",
+                "Зачтено: котлет",
+                "Браво! Вы получили 2 очка за это слово. 🤩",
+                "Отклонено: zz (принимаются слова из 3 букв и длиннее)",
+            ]
+            assert len(sent) == 2
+            assert broadcast_mock.await_count == 1
+            assert game.players[1].points == 3
+        finally:
+            app.ACTIVE_GAMES.clear()
+            app.ACTIVE_GAMES.update(old_active)
+            app.CHAT_GAMES.clear()
+            app.CHAT_GAMES.update(old_chat_games)
+
+    asyncio.run(run())
+
+
+def test_admin_submission_uses_shared_word_checks():
+    old_active = app.ACTIVE_GAMES.copy()
+    old_chat_games = app.CHAT_GAMES.copy()
+    try:
+        game = app.GameState(host_id=1, game_id="gid", status="running")
+        game.players[1] = app.Player(user_id=1, name="Админ")
+        game.base_word = "котлета"
+        game.letters = app.Counter(game.base_word)
+        game.valid_words = {"кот"}
+        app.ACTIVE_GAMES["gid"] = game
+        app.CHAT_GAMES[(1, 0)] = "gid"
+
+        message = DummyMessage(1, 1, "кот кот zz")
+        update = SimpleNamespace(effective_user=message.from_user, message=message)
+        with (
+            patch.object(app, "ADMIN_ID", 1),
+            patch.object(app, "schedule_refresh_base_button", lambda *a, **kw: None),
+            pytest.raises(app.ApplicationHandlerStop),
+        ):
+            asyncio.run(app.handle_submission(update, SimpleNamespace()))
+
+        assert [text for text, _ in message.replies] == [
+            "Зачтено: кот",
+            "Отклонено: кот (вы уже использовали это слово)",
+            "Отклонено: zz (принимаются слова из 3 букв и длиннее)",
+        ]
+        assert game.players[1].points == 1
+    finally:
+        app.ACTIVE_GAMES.clear()
+        app.ACTIVE_GAMES.update(old_active)
+        app.CHAT_GAMES.clear()
+        app.CHAT_GAMES.update(old_chat_games)
+
+
 def test_compose_end_game_sends_stats_message():
     async def run():
         old_active = app.ACTIVE_GAMES.copy()